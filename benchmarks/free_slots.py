@@ -0,0 +1,114 @@
+"""
+Coste de find_free_slots con agendas grandes
+
+Carga en un IntervalIndex agendas sintéticas de distintos tamaños (citas
+repartidas en un año, con solapes) y mide la búsqueda de huecos tal como
+la hace la herramienta: tramos ocupados del rango fusionados y barrido
+contra el horario laboral. Como referencia se mide también la estrategia
+anterior de los agentes: probar ventanas consecutivas con check_availability
+(cada prueba es aquí una consulta local; contra el backend sería un POST).
+
+Falla (código de salida 1) si la mediana con la agenda más grande supera
+el presupuesto.
+
+Uso:
+    python -m benchmarks.free_slots --sizes 1000,10000,100000 --days 30 --budget-ms 5
+"""
+import argparse
+import random
+import statistics
+import sys
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from tools.interval_index import IntervalIndex
+from tools.free_slots import parse_working_hours, working_windows, sweep_free
+
+YEAR_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def make_appointments(count: int, seed: int) -> list:
+    """Citas de 15 a 120 minutos en horas de oficina, en orden aleatorio"""
+    generator = random.Random(seed)
+    appointments = []
+    for i in range(count):
+        start = YEAR_START + timedelta(days=generator.randrange(365), hours=generator.randrange(8, 19),
+                                       minutes=15 * generator.randrange(4))
+        end = start + timedelta(minutes=15 * generator.randint(1, 8))
+        appointments.append({
+            "id": f"apt-{i}",
+            "title": f"Cita {i}",
+            "start_time": start.isoformat(),
+            "end_time": end.isoformat(),
+            "status": "cancelled" if i % 20 == 0 else "scheduled",
+        })
+    return appointments
+
+def sweep(index: IntervalIndex, first: datetime, last: datetime, hours: tuple, duration: float, limit: int) -> list:
+    busy = index.busy(first.timestamp(), last.timestamp())
+    return sweep_free(busy, working_windows(first, last, hours), duration, limit)
+
+def probe(index: IntervalIndex, first: datetime, last: datetime, hours: tuple, duration: float, limit: int,
+          step: float = 1800) -> tuple:
+    """Huecos encontrados probando ventanas cada `step` segundos, y número de pruebas"""
+    found, probes = [], 0
+    for window_start, window_end in working_windows(first, last, hours):
+        candidate = window_start
+        while candidate + duration <= window_end:
+            probes += 1
+            if not index.overlapping(candidate, candidate + duration):
+                found.append(candidate)
+                if len(found) >= limit:
+                    return found, probes
+            candidate += step
+    return found, probes
+
+def median_ms(function, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = perf_counter()
+        function()
+        samples.append((perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Búsqueda de huecos libres con agendas grandes")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Tamaños de agenda separados por comas")
+    parser.add_argument("--days", type=int, default=30, help="Días del rango de búsqueda")
+    parser.add_argument("--duration", type=int, default=60, help="Duración del hueco en minutos")
+    parser.add_argument("--working-hours", default="MO-FR 09:00-18:00", help="Horario laboral")
+    parser.add_argument("--limit", type=int, default=10, help="Huecos pedidos")
+    parser.add_argument("--repeat", type=int, default=50, help="Búsquedas por medición")
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="Mediana máxima con la agenda más grande")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    hours = parse_working_hours(args.working_hours)
+    duration = args.duration * 60
+    first = YEAR_START + timedelta(days=120)
+    last = first + timedelta(days=args.days)
+    print(f"Rango de {args.days} días, huecos de {args.duration} min en '{args.working_hours}', limit={args.limit}")
+    print(f"  {'citas':>8s} {'carga (ms)':>11s} {'barrido (ms)':>13s} {'todo el rango (ms)':>19s} "
+          f"{'sondeo (ms)':>12s} {'pruebas':>8s} {'huecos':>7s}")
+    largest = None
+    for size in sizes:
+        appointments = make_appointments(size, args.seed)
+        index = IntervalIndex()
+        started = perf_counter()
+        index.load(appointments)
+        load_ms = (perf_counter() - started) * 1000
+
+        gaps = sweep(index, first, last, hours, duration, args.limit)
+        _, probes = probe(index, first, last, hours, duration, args.limit)
+        sweep_ms = median_ms(lambda: sweep(index, first, last, hours, duration, args.limit), args.repeat)
+        full_ms = median_ms(lambda: sweep(index, first, last, hours, duration, 10 ** 9), args.repeat)
+        probe_ms = median_ms(lambda: probe(index, first, last, hours, duration, args.limit), args.repeat)
+        print(f"  {size:8d} {load_ms:11.1f} {sweep_ms:13.3f} {full_ms:19.3f} {probe_ms:12.3f} {probes:8d} {len(gaps):7d}")
+        largest = full_ms
+
+    if largest is not None and largest > args.budget_ms:
+        print(f"FALLO: {largest:.3f} ms con {sizes[-1]} citas supera el presupuesto de {args.budget_ms} ms")
+        sys.exit(1)
+    print(f"OK: barrido del rango completo con {sizes[-1]} citas por debajo de {args.budget_ms} ms")
+
+if __name__ == "__main__":
+    main()
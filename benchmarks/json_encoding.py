@@ -0,0 +1,82 @@
+"""
+CPU por petición al devolver un listado desde el wrapper HTTP
+
+Compara, sobre el mismo cuerpo del backend, los tres caminos posibles de
+una respuesta de /tools/{tool_name}:
+
+- fastapi:     response.json() + jsonable_encoder + JSONResponse (comportamiento anterior)
+- fast_json:   tools.fast_json.loads + FastJSONResponse codificando de nuevo
+- passthrough: tools.fast_json.decode_response + FastJSONResponse reenviando los bytes
+
+En los dos primeros casos se mide también solo la respuesta (sin decodificar),
+que es lo que cuesta cada acierto de caché.
+
+Uso:
+    python -m benchmarks.json_encoding --items 2000 --repeat 200
+"""
+import argparse
+import json
+from time import process_time
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from tools import fast_json
+from server.responses import FastJSONResponse
+
+def make_body(items: int) -> bytes:
+    tasks = [
+        {
+            "id": f"task-{i}",
+            "title": f"Tarea {i}",
+            "description": "Tarea generada para benchmark con acentos: revisión, número",
+            "status": ("pending", "in_progress", "completed")[i % 3],
+            "priority": ("low", "medium", "high", "urgent")[i % 4],
+            "category": "work",
+            "tags": ["benchmark", f"lote-{i % 10}"],
+            "due_date": None,
+        }
+        for i in range(items)
+    ]
+    return json.dumps({"tasks": tasks}).encode()
+
+def cpu_per_call(function, repeat: int) -> float:
+    """Microsegundos de CPU por llamada (mediana de tres series)"""
+    series = []
+    for _ in range(3):
+        started = process_time()
+        for _ in range(repeat):
+            function()
+        series.append((process_time() - started) / repeat * 1e6)
+    return sorted(series)[1]
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU por respuesta de listado según el modo de codificación")
+    parser.add_argument("--items", type=int, default=2000, help="Tareas en el listado")
+    parser.add_argument("--repeat", type=int, default=100, help="Respuestas por serie")
+    args = parser.parse_args()
+
+    body = make_body(args.items)
+    response = httpx.Response(200, content=body, headers={"content-type": "application/json"})
+    decoded = response.json()
+    raw = fast_json.RawJSON(decoded, body)
+
+    results = {
+        "fastapi (decodificar + responder)": lambda: JSONResponse(jsonable_encoder(response.json())),
+        "fast_json (decodificar + responder)": lambda: FastJSONResponse(fast_json.loads(body)),
+        "passthrough (decodificar + responder)": lambda: FastJSONResponse(fast_json.decode_response(response)),
+        "fastapi (acierto de caché)": lambda: JSONResponse(jsonable_encoder(decoded)),
+        "fast_json (acierto de caché)": lambda: FastJSONResponse(decoded),
+        "passthrough (acierto de caché)": lambda: FastJSONResponse(raw),
+    }
+    encoder = "orjson" if fast_json.orjson is not None else "json (orjson no instalado)"
+    print(f"Listado de {args.items} tareas ({len(body) / 1024:.0f} KiB), codificador: {encoder}")
+    baseline = None
+    for name, function in results.items():
+        micros = cpu_per_call(function, args.repeat)
+        if name.startswith("fastapi"):
+            baseline = micros
+        ratio = f"  x{baseline / micros:5.1f}" if baseline else ""
+        print(f"  {name:40s} {micros:10.0f} µs CPU{ratio}")
+
+if __name__ == "__main__":
+    main()
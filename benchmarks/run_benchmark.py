@@ -0,0 +1,258 @@
+"""
+Benchmark de throughput y latencia del servidor MCP
+
+Arranca el backend simulado y el servidor (modo http) como subprocesos,
+lanza llamadas concurrentes a cada herramienta por /tools/{tool_name} y por
+el transporte nativo /mcp, e informa req/s, p50/p95/p99 y memoria (RSS) del
+servidor. El resultado se guarda en JSON para comparar entre commits.
+
+Uso:
+    python -m benchmarks.run_benchmark --concurrency 32 --requests 500
+    python -m benchmarks.run_benchmark --transports http --tools list_tasks --compare benchmarks/results/anterior.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+import httpx
+from benchmarks.stub_backend import add_stub_arguments
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Argumentos de cada herramienta medida (se llaman con el mismo cuerpo en ambos transportes)
+SCENARIOS = {
+    "list_tasks": {},
+    "list_appointments": {},
+    "get_task_summary": {},
+    "get_appointment_summary": {},
+    "get_all_data": {},
+    "check_availability": {"start_time": "2025-01-06T10:00:00+00:00", "end_time": "2025-01-06T10:30:00+00:00"},
+    "create_task": {"title": "Tarea de benchmark", "priority": "low"},
+}
+DEFAULT_TOOLS = ["list_tasks", "get_task_summary", "check_availability", "get_all_data", "create_task"]
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def read_memory(pid: int) -> dict:
+    """RSS actual y máximo del proceso en MiB (Linux, vía /proc)"""
+    memory = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    memory["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith("VmHWM:"):
+                    memory["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while perf_counter() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} no respondió en {timeout:.0f}s")
+
+def start_processes(args) -> tuple:
+    """Arrancar backend simulado y servidor MCP; devuelve (procesos, url del servidor)"""
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_backend", "--port", str(args.stub_port),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+         "--error-rate", str(args.error_rate), "--tasks", str(args.tasks),
+         "--appointments", str(args.appointments), "--seed", str(args.seed)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    env = {
+        **os.environ,
+        "MCP_TRANSPORT": "http",
+        "FORCE_HTTP_MODE": "true",
+        "MCP_HOST": "127.0.0.1",
+        "MCP_PORT": str(args.server_port),
+        "BACKEND_URL": f"http://127.0.0.1:{args.stub_port}",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=env,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return [server, stub], f"http://127.0.0.1:{args.server_port}"
+
+async def drive(call, total: int, concurrency: int) -> dict:
+    """Ejecutar `total` llamadas con `concurrency` trabajadores y medir cada una"""
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = perf_counter()
+            try:
+                ok = await call()
+            except Exception:
+                ok = False
+            latencies.append(perf_counter() - started)
+            errors += not ok
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+async def bench_http(base_url: str, tool: str, arguments: dict, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def call():
+            response = await client.post(f"/tools/{tool}", json=arguments)
+            return response.status_code == 200 and "error" not in response.json()
+
+        await drive(call, args.warmup, args.concurrency)
+        return await drive(call, args.requests, args.concurrency)
+
+async def bench_mcp(base_url: str, tool: str, arguments: dict, args) -> dict:
+    from fastmcp import Client
+
+    # Una sesión MCP por trabajador, como varios agentes conectados a la vez
+    clients = [Client(f"{base_url}/mcp/mcp") for _ in range(args.concurrency)]
+    await asyncio.gather(*(client.__aenter__() for client in clients))
+    try:
+        idle = asyncio.Queue()
+        for client in clients:
+            idle.put_nowait(client)
+
+        async def call():
+            client = await idle.get()
+            try:
+                result = await client.call_tool(tool, arguments, raise_on_error=False)
+                content = result.structured_content
+                return not result.is_error and not (isinstance(content, dict) and "error" in content)
+            finally:
+                idle.put_nowait(client)
+
+        await drive(call, args.warmup, args.concurrency)
+        return await drive(call, args.requests, args.concurrency)
+    finally:
+        await asyncio.gather(*(client.__aexit__(None, None, None) for client in clients), return_exceptions=True)
+
+async def run(args, server_pid) -> list:
+    base_url = args.server_url or f"http://127.0.0.1:{args.server_port}"
+    await wait_ready(f"{base_url}/health")
+    results = []
+    for transport in args.transports:
+        for tool in args.tools:
+            bench = bench_http if transport == "http" else bench_mcp
+            result = await bench(base_url, tool, SCENARIOS[tool], args)
+            result = {"tool": tool, "transport": transport, **result}
+            if server_pid is not None:
+                result.update(read_memory(server_pid))
+            results.append(result)
+            print(f"{transport:<4} {tool:<24} {result['rps']:>8} req/s  p50 {result['p50_ms']:>7} ms  "
+                  f"p95 {result['p95_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  errores {result['errors']}"
+                  + (f"  rss {result['rss_mb']} MiB" if result.get("rss_mb") is not None else ""))
+    return results
+
+def compare(results: list, baseline_path: str):
+    """Mostrar la variación de req/s y p95 respecto a un resultado anterior"""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {(r["tool"], r["transport"]): r for r in baseline["results"]}
+    print(f"\nComparación con {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for result in results:
+        before = previous.get((result["tool"], result["transport"]))
+        if before is None:
+            continue
+        rps_delta = (result["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0.0
+        p95_delta = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        print(f"{result['transport']:<4} {result['tool']:<24} req/s {rps_delta:+6.1f}%  p95 {p95_delta:+6.1f}%")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark del servidor MCP contra un backend simulado")
+    parser.add_argument("--concurrency", type=int, default=16, help="Llamadas simultáneas")
+    parser.add_argument("--requests", type=int, default=300, help="Llamadas medidas por herramienta y transporte")
+    parser.add_argument("--warmup", type=int, default=30, help="Llamadas de calentamiento no medidas")
+    parser.add_argument("--tools", type=lambda value: value.split(","), default=DEFAULT_TOOLS,
+                        help=f"Herramientas separadas por comas ({', '.join(SCENARIOS)})")
+    parser.add_argument("--transports", type=lambda value: value.split(","), default=["http", "mcp"],
+                        help="Transportes separados por comas (http, mcp)")
+    parser.add_argument("--server-port", type=int, default=8101)
+    parser.add_argument("--stub-port", type=int, default=8102)
+    parser.add_argument("--server-url", help="Usar un servidor ya arrancado en lugar de lanzar los subprocesos")
+    parser.add_argument("--output", help="Fichero JSON de salida (por defecto benchmarks/results/<fecha>_<commit>.json)")
+    parser.add_argument("--compare", help="Resultado JSON anterior con el que comparar")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    unknown = [tool for tool in args.tools if tool not in SCENARIOS]
+    if unknown:
+        parser.error(f"Herramientas sin escenario: {', '.join(unknown)}")
+    if set(args.transports) - {"http", "mcp"}:
+        parser.error("Transportes válidos: http, mcp")
+    return args
+
+def main():
+    args = parse_args()
+    processes, server_pid = [], None
+    if not args.server_url:
+        processes, _ = start_processes(args)
+        server_pid = processes[0].pid
+    try:
+        results = asyncio.run(run(args, server_pid))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}_{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nResultados guardados en {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Tiempo de arranque en frío del modo stdio
+
+Lanza `python main.py` en modo stdio como lo haría un editor, envía la
+petición `initialize` de MCP y mide cuánto tarda la respuesta. Falla (código
+de salida 1) si la mediana supera el presupuesto o si el arranque en stdio
+importa módulos que solo necesita el wrapper HTTP.
+
+Uso:
+    python -m benchmarks.startup_time --runs 5 --budget-ms 1500
+    python -m benchmarks.startup_time --importtime 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from time import perf_counter
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Módulos que el modo stdio no debe cargar
+HTTP_ONLY_MODULES = ["fastapi", "server.http_app", "server.admission", "server.batch", "server.streaming",
+                     "server.responses", "server.profiling"]
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-check", "version": "1.0.0"},
+    },
+}
+
+def stdio_env() -> dict:
+    return {**os.environ, "MCP_TRANSPORT": "stdio", "FORCE_HTTP_MODE": "false"}
+
+def measure_cold_start(timeout: float) -> float:
+    """Segundos desde el lanzamiento del proceso hasta la respuesta a initialize"""
+    started = perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=stdio_env(),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    # Si no llega respuesta se mata el proceso y readline() devuelve fin de fichero
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+    try:
+        process.stdin.write(json.dumps(INITIALIZE) + "\n")
+        process.stdin.flush()
+        while True:
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"El servidor no respondió a initialize en {timeout:.0f}s")
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("id") == 1:
+                return perf_counter() - started
+    finally:
+        watchdog.cancel()
+        process.kill()
+        process.wait()
+
+def loaded_http_modules() -> list:
+    """Módulos exclusivos del wrapper HTTP que se cargan al importar main en stdio"""
+    code = (
+        "import json, sys, main; "
+        f"print(json.dumps([name for name in {HTTP_ONLY_MODULES!r} if name in sys.modules]))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=stdio_env(),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def slowest_imports(count: int) -> list:
+    """Imports de primer nivel más lentos según `python -X importtime`"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                            env=stdio_env(), capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Solo módulos de primer nivel (sangría de dos espacios): el resto ya cuenta en ellos
+        if name.startswith("   ") and not name.startswith("    "):
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío del modo stdio frente a un presupuesto")
+    parser.add_argument("--runs", type=int, default=5, help="Arranques medidos")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Mediana máxima permitida")
+    parser.add_argument("--timeout", type=float, default=30, help="Segundos máximos por arranque")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="Mostrar los N imports de primer nivel más lentos")
+    args = parser.parse_args()
+
+    # Un arranque previo sin medir llena la caché de bytecode y la del sistema de ficheros
+    measure_cold_start(args.timeout)
+    samples = sorted(measure_cold_start(args.timeout) * 1000 for _ in range(args.runs))
+    median = statistics.median(samples)
+    print(f"Arranque stdio ({args.runs} ejecuciones): min {samples[0]:.0f} ms  "
+          f"mediana {median:.0f} ms  max {samples[-1]:.0f} ms  (presupuesto {args.budget_ms:.0f} ms)")
+
+    if args.importtime:
+        print("\nImports más lentos:")
+        for milliseconds, name in slowest_imports(args.importtime):
+            print(f"  {milliseconds:8.1f} ms  {name}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"la mediana ({median:.0f} ms) supera el presupuesto ({args.budget_ms:.0f} ms)")
+    http_modules = loaded_http_modules()
+    if http_modules:
+        failures.append(f"el modo stdio importa módulos del wrapper HTTP: {', '.join(http_modules)}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Arranque dentro del presupuesto")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Backend simulado de /api/v1 para benchmarks
+
+Implementa las rutas de tareas y citas que usan las herramientas con datos
+en memoria por usuario, latencia configurable (base + jitter) y una tasa de
+errores 503 para ejercitar reintentos y circuit breakers. Los listados llevan
+ETag y Last-Modified y responden 304 a las peticiones condicionales si no
+hubo escrituras en esa colección del usuario.
+
+Uso:
+    python -m benchmarks.stub_backend --port 8002 --latency-ms 20 --error-rate 0.01 --tasks 1000
+"""
+import argparse
+import asyncio
+import random
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+TASK_STATUSES = ["pending", "in_progress", "completed", "cancelled"]
+PRIORITIES = ["low", "medium", "high", "urgent"]
+CATEGORIES = ["work", "personal", "health", "finance", "education", "other"]
+
+def _generate_tasks(count: int, rng: random.Random) -> dict:
+    tasks = {}
+    for i in range(count):
+        task_id = f"task-{i}"
+        tasks[task_id] = {
+            "id": task_id,
+            "title": f"Tarea {i}",
+            "description": "Tarea generada para benchmark",
+            "status": rng.choice(TASK_STATUSES),
+            "priority": rng.choice(PRIORITIES),
+            "category": rng.choice(CATEGORIES),
+            "tags": ["benchmark"],
+            "due_date": None,
+        }
+    return tasks
+
+def _generate_appointments(count: int, rng: random.Random) -> dict:
+    appointments = {}
+    base = datetime(2025, 1, 6, tzinfo=timezone.utc)
+    for i in range(count):
+        appointment_id = f"appt-{i}"
+        start = base + timedelta(days=i // 6, hours=9 + (i % 6) * 1.5)
+        appointments[appointment_id] = {
+            "id": appointment_id,
+            "title": f"Cita {i}",
+            "description": "",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=rng.choice([30, 45, 60]))).isoformat(),
+            "status": "scheduled",
+            "location": "Oficina",
+            "participants": [],
+        }
+    return appointments
+
+def _parse(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _overlaps(appointment: dict, start: str, end: str) -> bool:
+    return (appointment["status"] != "cancelled"
+            and _parse(appointment["start_time"]) < _parse(end)
+            and _parse(appointment["end_time"]) > _parse(start))
+
+def create_stub_app(latency_ms: float = 10.0, jitter_ms: float = 5.0, error_rate: float = 0.0,
+                    tasks: int = 100, appointments: int = 50, seed: int = 42) -> FastAPI:
+    """Crear la app del backend simulado con la configuración indicada"""
+    app = FastAPI(title="Backend simulado para benchmarks")
+    rng = random.Random(seed)
+    users = {}
+    stats = {"requests": 0, "errors": 0, "not_modified": 0}
+    # (usuario, colección) -> (versión, fecha de la última escritura)
+    versions = {}
+    started = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def store(user_id: str) -> dict:
+        # Cada usuario recibe su propia copia del conjunto de datos inicial
+        if user_id not in users:
+            user_rng = random.Random(f"{seed}:{user_id}")
+            users[user_id] = {
+                "tasks": _generate_tasks(tasks, user_rng),
+                "appointments": _generate_appointments(appointments, user_rng),
+            }
+        return users[user_id]
+
+    @app.middleware("http")
+    async def simulate_backend(request: Request, call_next):
+        if request.url.path.startswith("/api/v1"):
+            stats["requests"] += 1
+            delay = latency_ms + rng.uniform(0, jitter_ms)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+            if rng.random() < error_rate:
+                stats["errors"] += 1
+                return JSONResponse(status_code=503, content={"detail": "Error simulado"})
+        response = await call_next(request)
+        parts = request.url.path.split("/")
+        is_write = request.method != "GET" and not request.url.path.endswith("/check-availability")
+        if is_write and response.status_code < 400 and len(parts) > 3:
+            # Cualquier escritura cambia la versión de la colección del usuario
+            key = (request.query_params.get("user_id", "default-user"), parts[3])
+            version = versions.get(key, (0, None))[0]
+            versions[key] = (version + 1, datetime.now(timezone.utc).replace(microsecond=0))
+        return response
+
+    def conditional(request: Request, user_id: str, collection: str, build):
+        """Responder 304 si el cliente ya tiene esta versión del listado; si no, el cuerpo con validadores"""
+        version, modified = versions.get((user_id, collection), (0, started))
+        query = zlib.crc32(str(sorted(request.query_params.items())).encode())
+        headers = {"ETag": f'"{collection}-{version}-{query:08x}"', "Last-Modified": format_datetime(modified, usegmt=True)}
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_none_match is not None:
+            fresh = headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]
+        elif if_modified_since is not None:
+            try:
+                fresh = parsedate_to_datetime(if_modified_since) >= modified
+            except (TypeError, ValueError):
+                fresh = False
+        else:
+            fresh = False
+        if fresh:
+            stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(build(), headers=headers)
+
+    def not_found(kind: str):
+        return JSONResponse(status_code=404, content={"detail": f"{kind} no encontrada"})
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "users": len(users), **stats}
+
+    # === TAREAS ===
+
+    @app.get("/api/v1/tasks/")
+    async def list_tasks(request: Request, user_id: str = "default-user", status: str = None,
+                         priority: str = None, category: str = None):
+        def build():
+            items = [
+                task for task in store(user_id)["tasks"].values()
+                if (status is None or task["status"] == status)
+                and (priority is None or task["priority"] == priority)
+                and (category is None or task["category"] == category)
+            ]
+            return {"tasks": items, "total": len(items)}
+        return conditional(request, user_id, "tasks", build)
+
+    @app.post("/api/v1/tasks/")
+    async def create_task(request: Request, user_id: str = "default-user"):
+        task = await request.json()
+        task.update(id=str(uuid.uuid4()), status="pending")
+        store(user_id)["tasks"][task["id"]] = task
+        return task
+
+    @app.get("/api/v1/tasks/{task_id}")
+    async def get_task(task_id: str, user_id: str = "default-user"):
+        task = store(user_id)["tasks"].get(task_id)
+        return task if task is not None else not_found("Tarea")
+
+    @app.put("/api/v1/tasks/{task_id}")
+    async def update_task(task_id: str, request: Request, user_id: str = "default-user"):
+        task = store(user_id)["tasks"].get(task_id)
+        if task is None:
+            return not_found("Tarea")
+        task.update(await request.json())
+        return task
+
+    @app.delete("/api/v1/tasks/{task_id}")
+    async def delete_task(task_id: str, user_id: str = "default-user"):
+        if store(user_id)["tasks"].pop(task_id, None) is None:
+            return not_found("Tarea")
+        return {"message": "Tarea eliminada", "id": task_id}
+
+    @app.post("/api/v1/tasks/{task_id}/complete")
+    async def complete_task(task_id: str, user_id: str = "default-user"):
+        task = store(user_id)["tasks"].get(task_id)
+        if task is None:
+            return not_found("Tarea")
+        task["status"] = "completed"
+        return task
+
+    # === CITAS ===
+
+    @app.get("/api/v1/appointments/")
+    async def list_appointments(request: Request, user_id: str = "default-user", date_filter: str = None,
+                                status: str = None):
+        def build():
+            items = [
+                appointment for appointment in store(user_id)["appointments"].values()
+                if (status is None or appointment["status"] == status)
+                and (date_filter is None or appointment["start_time"].startswith(date_filter))
+            ]
+            return {"appointments": items, "total": len(items)}
+        return conditional(request, user_id, "appointments", build)
+
+    @app.post("/api/v1/appointments/check-availability")
+    async def check_availability(request: Request, user_id: str = "default-user"):
+        body = await request.json()
+        conflicts = [
+            appointment for appointment in store(user_id)["appointments"].values()
+            if _overlaps(appointment, body["start_time"], body["end_time"])
+        ]
+        return {"available": not conflicts, "conflicts": conflicts}
+
+    @app.post("/api/v1/appointments/")
+    async def create_appointment(request: Request, user_id: str = "default-user"):
+        appointment = await request.json()
+        appointment.update(id=str(uuid.uuid4()), status="scheduled")
+        store(user_id)["appointments"][appointment["id"]] = appointment
+        return appointment
+
+    @app.get("/api/v1/appointments/{appointment_id}")
+    async def get_appointment(appointment_id: str, user_id: str = "default-user"):
+        appointment = store(user_id)["appointments"].get(appointment_id)
+        return appointment if appointment is not None else not_found("Cita")
+
+    @app.put("/api/v1/appointments/{appointment_id}")
+    async def update_appointment(appointment_id: str, request: Request, user_id: str = "default-user"):
+        appointment = store(user_id)["appointments"].get(appointment_id)
+        if appointment is None:
+            return not_found("Cita")
+        appointment.update(await request.json())
+        return appointment
+
+    @app.delete("/api/v1/appointments/{appointment_id}")
+    async def delete_appointment(appointment_id: str, user_id: str = "default-user"):
+        if store(user_id)["appointments"].pop(appointment_id, None) is None:
+            return not_found("Cita")
+        return {"message": "Cita eliminada", "id": appointment_id}
+
+    @app.post("/api/v1/appointments/{appointment_id}/{action}")
+    async def change_appointment_status(appointment_id: str, action: str, user_id: str = "default-user"):
+        appointment = store(user_id)["appointments"].get(appointment_id)
+        if appointment is None or action not in ("complete", "cancel"):
+            return not_found("Cita")
+        appointment["status"] = "completed" if action == "complete" else "cancelled"
+        return appointment
+
+    return app
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    """Opciones del backend simulado (compartidas con run_benchmark)"""
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Latencia base por petición")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Latencia aleatoria adicional máxima")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de peticiones que responden 503")
+    parser.add_argument("--tasks", type=int, default=100, help="Tareas generadas por usuario")
+    parser.add_argument("--appointments", type=int, default=50, help="Citas generadas por usuario")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos y la latencia")
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Backend simulado de /api/v1 para benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_stub_app(args.latency_ms, args.jitter_ms, args.error_rate, args.tasks, args.appointments, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
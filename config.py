@@ -10,6 +10,9 @@ MCP_HOST = os.getenv("MCP_HOST", "0.0.0.0")
 MCP_PORT = int(os.getenv("MCP_PORT", 8001))
 MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "http")
 
+# Procesos del wrapper HTTP (0 = uno por núcleo)
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", 1))
+
 # URL del backend API
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8002")
 
@@ -17,6 +20,103 @@ BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8002")
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", 5))  # segundos para requests al backend
 AGENT_TIMEOUT = int(os.getenv("AGENT_TIMEOUT", 3))      # segundos para respuestas del agente según requerimientos
 
+# Pool de conexiones keep-alive hacia el backend
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", 100))           # conexiones simultáneas máximas
+BACKEND_POOL_KEEPALIVE = int(os.getenv("BACKEND_POOL_KEEPALIVE", 20))  # conexiones inactivas que se conservan abiertas
+BACKEND_KEEPALIVE_EXPIRY = float(os.getenv("BACKEND_KEEPALIVE_EXPIRY", 30))  # segundos antes de cerrar una conexión inactiva
+
+# Peticiones de cobertura (hedging) para lecturas idempotentes
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", 0.95))        # percentil de latencia que dispara el duplicado
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))      # muestras por ruta antes de empezar a cubrir
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", 256))               # latencias recientes consideradas por ruta
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 0.01))      # segundos mínimos antes de enviar el duplicado
+
+# Circuit breaker y reintentos hacia el backend
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))  # fallos consecutivos que abren el circuito
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 10))       # segundos abierto antes de probar de nuevo
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", 1))    # peticiones de prueba simultáneas
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 2))               # reintentos extra en operaciones idempotentes
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 0.05))              # segundos base del backoff exponencial
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 0.5))                 # espera máxima entre reintentos
+
+# Control de admisión del wrapper HTTP (/tools/{tool_name})
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", 50))   # llamadas simultáneas por herramienta
+TOOL_MAX_QUEUE = int(os.getenv("TOOL_MAX_QUEUE", 100))              # llamadas en espera por herramienta antes de responder 429
+TOOL_QUEUE_TIMEOUT = float(os.getenv("TOOL_QUEUE_TIMEOUT", AGENT_TIMEOUT))  # segundos máximos en cola antes de responder 503
+TOOL_EXECUTOR_WORKERS = int(os.getenv("TOOL_EXECUTOR_WORKERS", 16)) # hilos para herramientas síncronas/bloqueantes
+# Límites específicos por herramienta, p.ej. "get_all_data:10,list_tasks:20"
+TOOL_CONCURRENCY_LIMITS = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split(":", 1) for item in os.getenv("TOOL_CONCURRENCY_LIMITS", "").split(",") if ":" in item
+    )
+}
+
+# Máximo de llamadas aceptadas en POST /tools/batch
+BATCH_MAX_CALLS = int(os.getenv("BATCH_MAX_CALLS", 50))
+
+# Herramientas de escritura en bloque (create_tasks_bulk, schedule_appointments_bulk...)
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 100))            # elementos máximos por llamada
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", 8))  # peticiones simultáneas al backend por llamada
+
+# Ocurrencias máximas de una serie en schedule_recurring_appointment
+RECURRENCE_MAX_OCCURRENCES = int(os.getenv("RECURRENCE_MAX_OCCURRENCES", 366))
+
+# Amplitud máxima (días) del rango de búsqueda de find_free_slots
+FREE_SLOTS_MAX_DAYS = int(os.getenv("FREE_SLOTS_MAX_DAYS", 366))
+
+# Estado por usuario en memoria (resúmenes, índices de disponibilidad, contadores
+# de escrituras): máximo de entradas por mapa, expulsando la usada hace más tiempo
+USER_STATE_MAX_ENTRIES = int(os.getenv("USER_STATE_MAX_ENTRIES", 4096))
+
+# Usuario por defecto enviado al backend
+DEFAULT_USER_ID = os.getenv("DEFAULT_USER_ID", "default-user")
+
+# Reparto equitativo de las peticiones al backend entre usuarios
+TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", 20))  # peticiones simultáneas por usuario
+TENANT_RATE_LIMIT = float(os.getenv("TENANT_RATE_LIMIT", 0))           # peticiones por segundo por usuario (0 = sin límite)
+TENANT_RATE_BURST = float(os.getenv("TENANT_RATE_BURST", 20))          # ráfaga permitida por encima de la tasa
+
+# Caché de lecturas (list_tasks / list_appointments)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL = float(os.getenv("CACHE_TTL", 30))                           # segundos de vida de cada entrada
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))           # entradas máximas (LRU)
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 32 * 1024 * 1024))   # bytes máximos de respuestas cacheadas
+
+# Paginación de list_tasks / list_appointments
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", 500))  # elementos máximos por página
+
+# Revalidación de listados con ETag / Last-Modified (GET condicional, 304 Not Modified)
+CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "true").lower() == "true"
+CONDITIONAL_GET_MAX_ENTRIES = int(os.getenv("CONDITIONAL_GET_MAX_ENTRIES", 1024))                 # recursos recordados (LRU)
+CONDITIONAL_GET_MAX_BYTES = int(os.getenv("CONDITIONAL_GET_MAX_BYTES", 64 * 1024 * 1024))         # bytes máximos de cuerpos guardados
+
+# Reenviar al cliente HTTP el cuerpo original del backend cuando la respuesta no se modifica
+JSON_PASSTHROUGH = os.getenv("JSON_PASSTHROUGH", "true").lower() == "true"
+
+# Resúmenes incrementales (get_task_summary / get_appointment_summary)
+SUMMARY_RESYNC_INTERVAL = float(os.getenv("SUMMARY_RESYNC_INTERVAL", 300))  # segundos entre resincronizaciones completas
+
+# Disponibilidad local (check_availability desde un índice de intervalos en memoria)
+AVAILABILITY_LOCAL = os.getenv("AVAILABILITY_LOCAL", "true").lower() == "true"
+AVAILABILITY_BACKEND_FALLBACK = os.getenv("AVAILABILITY_BACKEND_FALLBACK", "true").lower() == "true"  # usar el backend si no se puede construir el índice
+AVAILABILITY_RESYNC_INTERVAL = float(os.getenv("AVAILABILITY_RESYNC_INTERVAL", 300))  # segundos entre reconstrucciones completas
+
+# Trazas por llamada a herramienta (etapas parse/validate/queue/backend/decode/serialize)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.01))     # fracción de llamadas exportadas a TRACE_EXPORT_FILE
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "")              # JSONL en formato OTLP/JSON (vacío = sin exportar)
+TRACE_SLOW_THRESHOLD_MS = float(os.getenv("TRACE_SLOW_THRESHOLD_MS", 1000))  # llamadas lentas (0 = sin registro)
+TRACE_SLOW_LOG_FILE = os.getenv("TRACE_SLOW_LOG_FILE", "")          # JSONL con el desglose de las llamadas lentas
+TRACE_SLOW_KEEP = int(os.getenv("TRACE_SLOW_KEEP", 100))            # llamadas lentas recientes en memoria (/traces/slow)
+
+# Perfilado bajo demanda del proceso en marcha (POST /admin/profile, desactivado por defecto)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")                       # cabecera X-Admin-Token exigida
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", 60))    # duración máxima de una sesión
+PROFILING_MAX_CALLS = int(os.getenv("PROFILING_MAX_CALLS", 1000))        # llamadas máximas a esperar en modo "calls"
+
 # Configuración de logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
@@ -41,7 +141,13 @@ AVAILABLE_TOOLS = [
     "update_task",
     "delete_task",
     "complete_task",
+    "create_tasks_bulk",
+    "update_tasks_bulk",
+    "complete_tasks_bulk",
     "schedule_appointment",
+    "schedule_appointments_bulk",
+    "schedule_recurring_appointment",
+    "find_free_slots",
     "check_availability",
     "list_appointments",
     "update_appointment",
@@ -1,24 +1,33 @@
 """Servidor FastMCP principal según requerimientos del documento"""
 import os
 import sys
-import uvicorn
 from fastmcp import FastMCP
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
 from tools.task_tools import task_tools
 from tools.appointment_tools import appointment_tools
+from tools.data_tools import data_tools
+from tools.registry import (
+    tool_registry, TASK_STATUSES, TASK_PRIORITIES, APPOINTMENT_STATUSES, DATETIME, DATE, FIELDS
+)
+from server.middleware import (
+    TracingMiddleware, DeadlineMiddleware, MetricsMiddleware, TenantMiddleware, ValidationMiddleware
+)
 from config import (
     MCP_HOST, MCP_PORT, BACKEND_URL, MCP_TRANSPORT, 
-    FORCE_HTTP_MODE, CORS_ORIGINS, DEBUG
+    FORCE_HTTP_MODE, DEBUG, LIST_MAX_LIMIT
 )
 
 # Crear servidor FastMCP
 mcp = FastMCP("Gestor Tareas y Citas MCP")
+mcp.add_middleware(TracingMiddleware())
+mcp.add_middleware(MetricsMiddleware())
+mcp.add_middleware(DeadlineMiddleware())
+mcp.add_middleware(TenantMiddleware())
+mcp.add_middleware(ValidationMiddleware())
 
 # === HERRAMIENTAS MCP PARA TAREAS ===
 @mcp.tool
-def create_task(title: str, description: str = "", due_date: str = None, priority: str = "medium", category: str = "personal", tags: list = None) -> dict:
+@tool_registry.tool(due_date=DATETIME, priority=TASK_PRIORITIES)
+async def create_task(title: str, description: str = "", due_date: str = None, priority: str = "medium", category: str = "personal", tags: list = None) -> dict:
     """
     Crear una nueva tarea
     
@@ -33,10 +42,13 @@ def create_task(title: str, description: str = "", due_date: str = None, priorit
     Returns:
         dict: Datos de la tarea creada o error
     """
-    return task_tools.create_task(title, description, due_date, priority, category, tags or [])
+    return await task_tools.create_task(title, description, due_date, priority, category, tags or [])
 
 @mcp.tool
-def list_tasks(status: str = None, priority: str = None, category: str = None) -> dict:
+@tool_registry.tool(status=TASK_STATUSES, priority=TASK_PRIORITIES, fields=FIELDS,
+                    limit=range(1, LIST_MAX_LIMIT + 1))
+async def list_tasks(status: str = None, priority: str = None, category: str = None,
+                     limit: int = None, cursor: str = None, fields: list = None, compact: bool = False) -> dict:
     """
     Listar tareas con filtros opcionales
     
@@ -44,14 +56,19 @@ def list_tasks(status: str = None, priority: str = None, category: str = None) -
         status: Filtrar por estado (pending, in_progress, completed, cancelled)
         priority: Filtrar por prioridad (low, medium, high, urgent)
         category: Filtrar por categoría
+        limit: Máximo de tareas por página, entre 1 y LIST_MAX_LIMIT (opcional)
+        cursor: Valor de next_cursor de la página anterior (opcional)
+        fields: Campos a devolver de cada tarea, p.ej. ["id", "title", "status"] (opcional)
+        compact: Devolver la lista por columnas {campo: [valores]} en lugar de objetos
     
     Returns:
-        dict: Lista de tareas que coinciden con los filtros
+        dict: Lista de tareas que coinciden con los filtros; con limit/cursor incluye total y next_cursor
     """
-    return task_tools.list_tasks(status, priority, category)
+    return await task_tools.list_tasks(status, priority, category, limit, cursor, fields, compact)
 
 @mcp.tool
-def update_task(task_id: str, title: str = None, description: str = None, status: str = None, priority: str = None, category: str = None, due_date: str = None) -> dict:
+@tool_registry.tool(status=TASK_STATUSES, priority=TASK_PRIORITIES, due_date=DATETIME)
+async def update_task(task_id: str, title: str = None, description: str = None, status: str = None, priority: str = None, category: str = None, due_date: str = None, tags: list = None) -> dict:
     """
     Actualizar una tarea existente
     
@@ -63,6 +80,7 @@ def update_task(task_id: str, title: str = None, description: str = None, status
         priority: Nueva prioridad (opcional)
         category: Nueva categoría (opcional)
         due_date: Nueva fecha límite (opcional)
+        tags: Nueva lista de etiquetas (opcional)
     
     Returns:
         dict: Datos de la tarea actualizada o error
@@ -80,11 +98,14 @@ def update_task(task_id: str, title: str = None, description: str = None, status
         updates["category"] = category
     if due_date is not None:
         updates["due_date"] = due_date
+    if tags is not None:
+        updates["tags"] = tags
     
-    return task_tools.update_task(task_id, **updates)
+    return await task_tools.update_task(task_id, **updates)
 
 @mcp.tool
-def delete_task(task_id: str) -> dict:
+@tool_registry.tool()
+async def delete_task(task_id: str) -> dict:
     """
     Eliminar una tarea
     
@@ -94,10 +115,11 @@ def delete_task(task_id: str) -> dict:
     Returns:
         dict: Confirmación de eliminación o error
     """
-    return task_tools.delete_task(task_id)
+    return await task_tools.delete_task(task_id)
 
 @mcp.tool
-def complete_task(task_id: str) -> dict:
+@tool_registry.tool()
+async def complete_task(task_id: str) -> dict:
     """
     Marcar tarea como completada
     
@@ -107,11 +129,54 @@ def complete_task(task_id: str) -> dict:
     Returns:
         dict: Datos de la tarea completada o error
     """
-    return task_tools.complete_task(task_id)
+    return await task_tools.complete_task(task_id)
+
+@mcp.tool
+@tool_registry.tool()
+async def create_tasks_bulk(tasks: list) -> dict:
+    """
+    Crear varias tareas en una sola llamada
+    
+    Args:
+        tasks: Lista de tareas con los campos de create_task (title requerido)
+    
+    Returns:
+        dict: Resultado por tarea en "results" (status ok/error) y totales; un fallo no detiene al resto
+    """
+    return await task_tools.create_tasks_bulk(tasks)
+
+@mcp.tool
+@tool_registry.tool()
+async def update_tasks_bulk(updates: list) -> dict:
+    """
+    Actualizar varias tareas en una sola llamada
+    
+    Args:
+        updates: Lista de objetos con task_id y los campos a cambiar
+    
+    Returns:
+        dict: Resultado por tarea en "results" (status ok/error) y totales; un fallo no detiene al resto
+    """
+    return await task_tools.update_tasks_bulk(updates)
+
+@mcp.tool
+@tool_registry.tool()
+async def complete_tasks_bulk(task_ids: list) -> dict:
+    """
+    Marcar varias tareas como completadas en una sola llamada
+    
+    Args:
+        task_ids: Lista de IDs de tareas
+    
+    Returns:
+        dict: Resultado por tarea en "results" (status ok/error) y totales; un fallo no detiene al resto
+    """
+    return await task_tools.complete_tasks_bulk(task_ids)
 
 # === HERRAMIENTAS MCP PARA CITAS ===
 @mcp.tool
-def schedule_appointment(title: str, start_time: str, duration_minutes: int = 60, description: str = "", location: str = "", participants: list = None) -> dict:
+@tool_registry.tool(start_time=DATETIME, duration_minutes=range(1, 24 * 60 + 1))
+async def schedule_appointment(title: str, start_time: str, duration_minutes: int = 60, description: str = "", location: str = "", participants: list = None) -> dict:
     """
     Programar una nueva cita
     
@@ -126,10 +191,74 @@ def schedule_appointment(title: str, start_time: str, duration_minutes: int = 60
     Returns:
         dict: Datos de la cita creada o error
     """
-    return appointment_tools.schedule_appointment(title, start_time, duration_minutes, description, location, participants or [])
+    return await appointment_tools.schedule_appointment(title, start_time, duration_minutes, description, location, participants or [])
+
+@mcp.tool
+@tool_registry.tool()
+async def schedule_appointments_bulk(appointments: list) -> dict:
+    """
+    Programar varias citas en una sola llamada
+    
+    Args:
+        appointments: Lista de citas con los campos de schedule_appointment (title y start_time requeridos)
+    
+    Returns:
+        dict: Resultado por cita en "results" (status ok/error) y totales; un fallo no detiene al resto
+    """
+    return await appointment_tools.schedule_appointments_bulk(appointments)
 
 @mcp.tool
-def check_availability(start_time: str, end_time: str) -> dict:
+@tool_registry.tool(start_time=DATETIME, duration_minutes=range(1, 24 * 60 + 1))
+async def schedule_recurring_appointment(title: str, start_time: str, rrule: str, duration_minutes: int = 60,
+                                         description: str = "", location: str = "", participants: list = None,
+                                         dry_run: bool = False) -> dict:
+    """
+    Programar una cita recurrente (serie) sin chocar con la agenda
+    
+    Args:
+        title: Título de las citas (requerido)
+        start_time: Primera ocurrencia en formato ISO; fija también la hora de todas (requerido)
+        rrule: Regla de recurrencia RRULE, p.ej. "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;UNTIL=20250430"
+               (FREQ DAILY/WEEKLY/MONTHLY, INTERVAL, BYDAY, BYMONTHDAY y COUNT o UNTIL) (requerido)
+        duration_minutes: Duración de cada cita en minutos
+        description: Descripción de las citas
+        location: Ubicación de las citas
+        participants: Lista de participantes
+        dry_run: Solo comprobar conflictos, sin crear nada
+    
+    Returns:
+        dict: Ocurrencias creadas ("appointments"), las que chocan con citas existentes
+              ("conflicts", con las citas afectadas) y las que fallaron ("errors")
+    """
+    return await appointment_tools.schedule_recurring_appointment(
+        title, start_time, rrule, duration_minutes, description, location, participants or [], dry_run
+    )
+
+@mcp.tool
+@tool_registry.tool(range_start=DATETIME, range_end=DATETIME, duration_minutes=range(1, 24 * 60 + 1),
+                    limit=range(1, 101))
+async def find_free_slots(range_start: str, range_end: str, duration_minutes: int = 60,
+                          working_hours: str = None, limit: int = 10) -> dict:
+    """
+    Buscar huecos libres en la agenda en una sola llamada
+
+    Args:
+        range_start: Inicio del rango de búsqueda en formato ISO (requerido)
+        range_end: Fin del rango de búsqueda en formato ISO (requerido)
+        duration_minutes: Duración mínima del hueco en minutos
+        working_hours: Horario laboral en la zona de range_start, p.ej. "MO-FR 09:00-18:00"
+                       o "09:00-17:00" (opcional; sin él se busca en todo el rango)
+        limit: Máximo de huecos a devolver (1-100)
+
+    Returns:
+        dict: Huecos ("slots") en orden, con el primer inicio posible (start_time,
+              end_time) y hasta cuándo sigue libre (free_until)
+    """
+    return await appointment_tools.find_free_slots(range_start, range_end, duration_minutes, working_hours, limit)
+
+@mcp.tool
+@tool_registry.tool(start_time=DATETIME, end_time=DATETIME)
+async def check_availability(start_time: str, end_time: str) -> dict:
     """
     Verificar disponibilidad de horario
     
@@ -140,24 +269,32 @@ def check_availability(start_time: str, end_time: str) -> dict:
     Returns:
         dict: Información sobre disponibilidad y conflictos
     """
-    return appointment_tools.check_availability(start_time, end_time)
+    return await appointment_tools.check_availability(start_time, end_time)
 
 @mcp.tool
-def list_appointments(date: str = None, status: str = None) -> dict:
+@tool_registry.tool(date=DATE, status=APPOINTMENT_STATUSES, fields=FIELDS,
+                    limit=range(1, LIST_MAX_LIMIT + 1))
+async def list_appointments(date: str = None, status: str = None,
+                            limit: int = None, cursor: str = None, fields: list = None, compact: bool = False) -> dict:
     """
     Listar citas con filtro de fecha opcional
     
     Args:
         date: Filtrar por fecha específica (YYYY-MM-DD)
         status: Filtrar por estado (scheduled, completed, cancelled, missed)
+        limit: Máximo de citas por página, entre 1 y LIST_MAX_LIMIT (opcional)
+        cursor: Valor de next_cursor de la página anterior (opcional)
+        fields: Campos a devolver de cada cita, p.ej. ["id", "title", "start_time"] (opcional)
+        compact: Devolver la lista por columnas {campo: [valores]} en lugar de objetos
     
     Returns:
-        dict: Lista de citas que coinciden con los filtros
+        dict: Lista de citas que coinciden con los filtros; con limit/cursor incluye total y next_cursor
     """
-    return appointment_tools.list_appointments(date, status)
+    return await appointment_tools.list_appointments(date, status, limit, cursor, fields, compact)
 
 @mcp.tool
-def update_appointment(appointment_id: str, title: str = None, start_time: str = None, end_time: str = None, description: str = None, location: str = None, status: str = None) -> dict:
+@tool_registry.tool(start_time=DATETIME, end_time=DATETIME, status=APPOINTMENT_STATUSES)
+async def update_appointment(appointment_id: str, title: str = None, start_time: str = None, end_time: str = None, description: str = None, location: str = None, status: str = None) -> dict:
     """
     Actualizar una cita existente
     
@@ -187,10 +324,11 @@ def update_appointment(appointment_id: str, title: str = None, start_time: str =
     if status is not None:
         updates["status"] = status
     
-    return appointment_tools.update_appointment(appointment_id, **updates)
+    return await appointment_tools.update_appointment(appointment_id, **updates)
 
 @mcp.tool
-def cancel_appointment(appointment_id: str) -> dict:
+@tool_registry.tool()
+async def cancel_appointment(appointment_id: str) -> dict:
     """
     Cancelar una cita
     
@@ -200,86 +338,61 @@ def cancel_appointment(appointment_id: str) -> dict:
     Returns:
         dict: Confirmación de cancelación o error
     """
-    return appointment_tools.cancel_appointment(appointment_id)
+    return await appointment_tools.cancel_appointment(appointment_id)
 
 # === HERRAMIENTAS DE INFORMACIÓN ===
 @mcp.tool
-def get_task_summary() -> dict:
+@tool_registry.tool()
+async def get_task_summary() -> dict:
     """
     Obtener resumen de tareas
     
     Returns:
         dict: Estadísticas generales de tareas
     """
-    try:
-        all_tasks = task_tools.list_tasks()
-        if "error" in all_tasks:
-            return all_tasks
-        
-        tasks = all_tasks.get("tasks", [])
-        total = len(tasks)
-        
-        by_status = {}
-        by_priority = {}
-        
-        for task in tasks:
-            status = task.get("status", "unknown")
-            priority = task.get("priority", "unknown")
-            
-            by_status[status] = by_status.get(status, 0) + 1
-            by_priority[priority] = by_priority.get(priority, 0) + 1
-        
-        return {
-            "total_tasks": total,
-            "by_status": by_status,
-            "by_priority": by_priority
-        }
-    except Exception as e:
-        return {"error": f"Error al obtener resumen: {str(e)}"}
+    return await task_tools.get_task_summary()
 
 @mcp.tool
-def get_appointment_summary() -> dict:
+@tool_registry.tool()
+async def get_appointment_summary() -> dict:
     """
     Obtener resumen de citas
     
     Returns:
         dict: Estadísticas generales de citas
     """
-    try:
-        all_appointments = appointment_tools.list_appointments()
-        if "error" in all_appointments:
-            return all_appointments
-        
-        appointments = all_appointments.get("appointments", [])
-        total = len(appointments)
-        
-        by_status = {}
-        
-        for apt in appointments:
-            status = apt.get("status", "unknown")
-            by_status[status] = by_status.get(status, 0) + 1
-        
-        return {
-            "total_appointments": total,
-            "by_status": by_status
-        }
-    except Exception as e:
-        return {"error": f"Error al obtener resumen: {str(e)}"}
+    return await appointment_tools.get_appointment_summary()
 
 @mcp.tool
-def get_all_data() -> dict:
-    """Obtener todos los datos de tareas y citas"""
-    try:
-        tasks = task_tools.list_tasks()
-        appointments = appointment_tools.list_appointments()
-        
-        return {
-            "tasks": tasks,
-            "appointments": appointments,
-            "timestamp": "2024-01-01T10:00:00Z"
-        }
-    except Exception as e:
-        return {"error": f"Error al obtener datos: {str(e)}"}
+@tool_registry.tool(fields=FIELDS)
+async def get_all_data(fields: list = None, compact: bool = False) -> dict:
+    """
+    Obtener todos los datos de tareas y citas
+    
+    Ambas consultas se lanzan en paralelo con el plazo AGENT_TIMEOUT; lo que
+    no termine a tiempo se marca como "timeout" en "status".
+    
+    Args:
+        fields: Campos a devolver de cada tarea y cita, p.ej. ["id", "title", "status"] (opcional)
+        compact: Devolver las listas por columnas {campo: [valores]} en lugar de objetos
+    
+    Returns:
+        dict: Tareas, citas, estado por sección y marca de tiempo
+    """
+    return await data_tools.get_all_data(fields, compact)
+
+def create_app():
+    """
+    Factory del wrapper HTTP para servidores ASGI externos
+
+    MCP_WORKERS=4 uvicorn main:create_app --factory --workers 4
+    MCP_WORKERS=4 gunicorn -w 4 -k uvicorn.workers.UvicornWorker "main:create_app()"
+
+    MCP_WORKERS debe coincidir con el número de workers: cada proceso lo lee
+    para servir /mcp sin sesión y limitar la resincronización a CACHE_TTL.
+    """
+    from server.http_app import create_http_app
+    return create_http_app(mcp)
 
 if __name__ == "__main__":
     # Verificar si se fuerza el modo HTTP (para Docker Compose)
@@ -298,88 +411,18 @@ if __name__ == "__main__":
         transport = MCP_TRANSPORT
         
         if transport == "http":
-            # Pequeño wrapper HTTP compatible con /health y /tools
-            http_app = FastAPI(title="FastMCP HTTP Wrapper")
-            http_app.add_middleware(
-                CORSMiddleware,
-                allow_origins=CORS_ORIGINS,
-                allow_credentials=True,
-                allow_methods=["*"],
-                allow_headers=["*"],
-            )
-
-            # Mapa de herramientas HTTP → funciones MCP
-            # Wrappers HTTP directos a las implementaciones internas (evita llamar a FunctionTool)
-            def _get_task_summary_http():
-                data = task_tools.list_tasks()
-                if "error" in data:
-                    return data
-                tasks = data.get("tasks", [])
-                by_status = {}
-                by_priority = {}
-                for t in tasks:
-                    by_status[t.get("status", "unknown")] = by_status.get(t.get("status", "unknown"), 0) + 1
-                    by_priority[t.get("priority", "unknown")] = by_priority.get(t.get("priority", "unknown"), 0) + 1
-                return {"total_tasks": len(tasks), "by_status": by_status, "by_priority": by_priority}
-
-            def _get_appointment_summary_http():
-                data = appointment_tools.list_appointments()
-                if "error" in data:
-                    return data
-                appointments = data.get("appointments", [])
-                by_status = {}
-                for a in appointments:
-                    by_status[a.get("status", "unknown")] = by_status.get(a.get("status", "unknown"), 0) + 1
-                return {"total_appointments": len(appointments), "by_status": by_status}
-
-            def _get_all_data_http():
-                return {"tasks": task_tools.list_tasks(), "appointments": appointment_tools.list_appointments()}
-
-            TOOL_MAP = {
-                "create_task": lambda **p: task_tools.create_task(**p),
-                "list_tasks": lambda **p: task_tools.list_tasks(**p),
-                "update_task": lambda **p: task_tools.update_task(**p),
-                "delete_task": lambda **p: task_tools.delete_task(**p),
-                "complete_task": lambda **p: task_tools.complete_task(**p),
-                "schedule_appointment": lambda **p: appointment_tools.schedule_appointment(**p),
-                "check_availability": lambda **p: appointment_tools.check_availability(**p),
-                "list_appointments": lambda **p: appointment_tools.list_appointments(**p),
-                "update_appointment": lambda **p: appointment_tools.update_appointment(**p),
-                "cancel_appointment": lambda **p: appointment_tools.cancel_appointment(**p),
-                "get_task_summary": lambda **p: _get_task_summary_http(),
-                "get_appointment_summary": lambda **p: _get_appointment_summary_http(),
-                "get_all_data": lambda **p: _get_all_data_http(),
-            }
-
-            @http_app.get("/health")
-            async def health():
-                return {"status": "healthy", "backend_url": BACKEND_URL}
-
-            @http_app.get("/tools")
-            async def list_tools():
-                return {"tools": list(TOOL_MAP.keys())}
-
-            @http_app.post("/tools/{tool_name}")
-            async def call_tool(tool_name: str, request: Request):
-                if tool_name not in TOOL_MAP:
-                    return JSONResponse(status_code=404, content={"error": f"Tool '{tool_name}' not found"})
-                payload = {}
-                try:
-                    payload = await request.json()
-                except Exception:
-                    payload = {}
-                try:
-                    result = TOOL_MAP[tool_name](**payload)
-                    return result
-                except TypeError as te:
-                    return JSONResponse(status_code=400, content={"error": str(te)})
-                except Exception as e:
-                    return JSONResponse(status_code=500, content={"error": str(e)})
-
-            # También montamos el app nativo HTTP de FastMCP bajo /mcp para Cursor
-            http_app.mount("/mcp", mcp.http_app())
+            # El stack HTTP (FastAPI, uvicorn) solo se importa en este modo:
+            # el arranque en stdio, que paga cada sesión del editor, no lo necesita
+            import uvicorn
+            from server.workers import worker_count
 
-            uvicorn.run(http_app, host=MCP_HOST, port=MCP_PORT)
+            workers = worker_count()
+            if workers > 1:
+                # Cada worker es un proceso propio que importa main y construye su app
+                print(f"👥 Workers: {workers}")
+                uvicorn.run("main:create_app", factory=True, host=MCP_HOST, port=MCP_PORT, workers=workers)
+            else:
+                uvicorn.run(create_app(), host=MCP_HOST, port=MCP_PORT)
         else:
             # Modo stdio por defecto
             mcp.run()
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""Control de admisión para las llamadas a herramientas del wrapper HTTP"""
+import asyncio
+import inspect
+import math
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from time import perf_counter
+from config import (
+    TOOL_MAX_CONCURRENCY, TOOL_MAX_QUEUE, TOOL_QUEUE_TIMEOUT,
+    TOOL_EXECUTOR_WORKERS, TOOL_CONCURRENCY_LIMITS
+)
+from tools.tracing import stage
+
+class AdmissionRejected(Exception):
+    """La llamada no fue admitida: cola llena (429) o espera agotada (503)"""
+
+    def __init__(self, tool_name: str, status_code: int, retry_after: int):
+        reason = "cola llena" if status_code == 429 else "tiempo de espera en cola agotado"
+        super().__init__(f"Herramienta '{tool_name}' saturada ({reason}), reintentar en {retry_after}s")
+        self.tool_name = tool_name
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class _ToolLimiter:
+    """Semáforo por herramienta con cola de espera acotada y estadísticas"""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.avg_service_time = 0.0
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que se libere un hueco para toda la cola actual"""
+        pending = (self.waiting + 1) / self.max_concurrency
+        return max(1, math.ceil(self.avg_service_time * pending))
+
+class AdmissionController:
+    """
+    Limita la concurrencia por herramienta y acota la cola de espera
+
+    Las corutinas se ejecutan en el event loop; las funciones síncronas se
+    envían a un ThreadPoolExecutor acotado para no bloquear el loop.
+    """
+
+    def __init__(self, max_concurrency: int = TOOL_MAX_CONCURRENCY, max_queue: int = TOOL_MAX_QUEUE,
+                 queue_timeout: float = TOOL_QUEUE_TIMEOUT, executor_workers: int = TOOL_EXECUTOR_WORKERS,
+                 limits: dict = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.executor_workers = executor_workers
+        self.limits = dict(TOOL_CONCURRENCY_LIMITS if limits is None else limits)
+        self._limiters = {}
+        self._executor = None
+
+    def _limiter(self, tool_name: str) -> _ToolLimiter:
+        limiter = self._limiters.get(tool_name)
+        if limiter is None:
+            limiter = _ToolLimiter(self.limits.get(tool_name, self.max_concurrency))
+            self._limiters[tool_name] = limiter
+        return limiter
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix="tool")
+        return self._executor
+
+    @asynccontextmanager
+    async def slot(self, tool_name: str):
+        """Reservar un hueco de ejecución o rechazar de inmediato si la cola está llena"""
+        limiter = self._limiter(tool_name)
+        if limiter.semaphore.locked():
+            if limiter.waiting >= self.max_queue:
+                limiter.rejected += 1
+                raise AdmissionRejected(tool_name, 429, limiter.retry_after())
+            limiter.waiting += 1
+            try:
+                with stage("queue", {"queue": "admission"}):
+                    await asyncio.wait_for(limiter.semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                limiter.rejected += 1
+                raise AdmissionRejected(tool_name, 503, limiter.retry_after())
+            finally:
+                limiter.waiting -= 1
+        else:
+            await limiter.semaphore.acquire()
+
+        limiter.in_flight += 1
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            limiter.in_flight -= 1
+            limiter.semaphore.release()
+            # Media móvil exponencial del tiempo de servicio para estimar Retry-After
+            elapsed = perf_counter() - started
+            limiter.avg_service_time += 0.2 * (elapsed - limiter.avg_service_time)
+
+    async def run(self, tool_name: str, func, **kwargs):
+        """Ejecutar una herramienta respetando los límites de admisión"""
+        async with self.slot(tool_name):
+            if inspect.iscoroutinefunction(func):
+                return await func(**kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(func, **kwargs))
+
+    def reset(self):
+        """Descartar semáforos e hilos heredados de otro proceso (fork)"""
+        self._limiters = {}
+        self._executor = None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def get_stats(self) -> dict:
+        """Estado de admisión por herramienta"""
+        return {
+            name: {
+                "limit": limiter.max_concurrency,
+                "in_flight": limiter.in_flight,
+                "waiting": limiter.waiting,
+                "rejected": limiter.rejected,
+            }
+            for name, limiter in self._limiters.items()
+        }
+
+# Instancia global del controlador de admisión
+admission = AdmissionController()
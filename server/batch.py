@@ -0,0 +1,109 @@
+"""Ejecución concurrente de lotes de llamadas a herramientas (POST /tools/batch)"""
+import asyncio
+from time import perf_counter
+from config import BATCH_MAX_CALLS
+from server.admission import AdmissionRejected
+from tools.deadline import deadline_scope
+from tools.fast_json import dumps, raw_body
+
+class BatchError(ValueError):
+    """Lote mal formado: se rechaza entero antes de ejecutar nada"""
+
+def parse_batch(payload: dict, tool_map: dict) -> list:
+    """
+    Validar el cuerpo del lote y normalizar cada llamada
+
+    Formato: {"calls": [{"id", "tool", "arguments", "depends_on"}], "ordered": bool}
+    Con "ordered": true cada llamada depende implícitamente de la anterior.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("calls"), list):
+        raise BatchError("El cuerpo debe ser un objeto con una lista 'calls'")
+    raw_calls = payload["calls"]
+    if not raw_calls:
+        raise BatchError("El lote está vacío")
+    if len(raw_calls) > BATCH_MAX_CALLS:
+        raise BatchError(f"El lote supera el máximo de {BATCH_MAX_CALLS} llamadas")
+
+    calls = []
+    seen = set()
+    for index, raw in enumerate(raw_calls):
+        if not isinstance(raw, dict) or not isinstance(raw.get("tool"), str):
+            raise BatchError(f"Llamada {index}: se requiere el campo 'tool'")
+        call_id = str(raw.get("id", index))
+        if call_id in seen:
+            raise BatchError(f"Llamada {index}: id duplicado '{call_id}'")
+        arguments = raw.get("arguments") or {}
+        if not isinstance(arguments, dict):
+            raise BatchError(f"Llamada '{call_id}': 'arguments' debe ser un objeto")
+        depends_on = [str(dep) for dep in raw.get("depends_on") or []]
+        if payload.get("ordered") and calls:
+            depends_on.append(calls[-1]["id"])
+        for dep in depends_on:
+            # Solo se permite depender de llamadas anteriores: así no hay ciclos
+            if dep not in seen:
+                raise BatchError(f"Llamada '{call_id}': dependencia desconocida o posterior '{dep}'")
+        seen.add(call_id)
+        calls.append({"id": call_id, "tool": raw["tool"], "arguments": arguments, "depends_on": depends_on})
+    return calls
+
+async def run_batch(calls: list, tool_map: dict, runner):
+    """
+    Ejecutar las llamadas concurrentemente y producir cada resultado al terminar
+
+    `runner(tool_name, func, **arguments)` es el punto de ejecución (control de
+    admisión). Si una dependencia falla, las llamadas que dependen de ella se
+    marcan como "skipped" sin ejecutarse.
+    """
+    done_events = {call["id"]: asyncio.Event() for call in calls}
+    succeeded = {}
+    results = asyncio.Queue()
+
+    async def execute(call):
+        started = perf_counter()
+        line = {"id": call["id"], "tool": call["tool"]}
+        try:
+            for dep in call["depends_on"]:
+                await done_events[dep].wait()
+            failed = [dep for dep in call["depends_on"] if not succeeded[dep]]
+            if failed:
+                line.update(status="skipped", error=f"Dependencias fallidas: {', '.join(failed)}")
+            elif call["tool"] not in tool_map:
+                line.update(status="error", error=f"Tool '{call['tool']}' not found")
+            else:
+                # Cada llamada del lote tiene su propio plazo desde que puede ejecutarse
+                with deadline_scope():
+                    result = await runner(call["tool"], tool_map[call["tool"]], **call["arguments"])
+                is_error = isinstance(result, dict) and "error" in result
+                line.update(status="error" if is_error else "ok", result=result)
+        except AdmissionRejected as rejected:
+            line.update(status="error", error=str(rejected), retry_after=rejected.retry_after)
+        except Exception as e:
+            line.update(status="error", error=str(e))
+        line["elapsed_ms"] = round((perf_counter() - started) * 1000, 2)
+        succeeded[call["id"]] = line["status"] == "ok"
+        done_events[call["id"]].set()
+        await results.put(line)
+
+    tasks = [asyncio.create_task(execute(call)) for call in calls]
+    try:
+        for _ in calls:
+            yield await results.get()
+    finally:
+        # Si el cliente se desconecta se cancelan las llamadas pendientes
+        for task in tasks:
+            task.cancel()
+
+async def stream_ndjson(lines):
+    """
+    Serializar cada resultado como una línea NDJSON
+
+    Si el resultado es el cuerpo original del backend (sin saltos de línea) se
+    inserta tal cual en la línea en lugar de volver a codificarlo.
+    """
+    async for line in lines:
+        raw = raw_body(line.get("result"))
+        if raw is None or b"\n" in raw:
+            yield dumps(line) + b"\n"
+        else:
+            head = dumps({key: value for key, value in line.items() if key != "result"})
+            yield head[:-1] + b',"result":' + raw + b"}\n"
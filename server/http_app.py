@@ -0,0 +1,264 @@
+"""Wrapper HTTP (FastAPI) con /health, /metrics y /tools, y el app MCP montado en /mcp"""
+import hmac
+import os
+import httpx
+from contextlib import AsyncExitStack, asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.middleware.cors import CORSMiddleware
+from fastmcp import FastMCP
+from tools.task_tools import task_tools
+from tools.appointment_tools import appointment_tools
+from tools.backend_client import backend
+from tools.cache import response_cache
+from tools.singleflight import single_flight
+from tools.summary import summary_engine
+from tools.interval_index import availability_index
+from tools.deadline import deadline_scope
+from tools.tenant import tenant_scope, validate_user_id, InvalidUserId
+from tools.projection import InvalidFields
+from tools.registry import tool_registry, ToolArgumentError
+from tools.metrics import registry, track_tool_call
+from tools.tracing import tracer, stage, set_attribute, mark_error
+from server.admission import admission, AdmissionRejected
+from server.batch import parse_batch, run_batch, stream_ndjson, BatchError
+from server.streaming import first_item, stream_json_list
+from server.responses import FastJSONResponse
+from server.profiling import profiler, parse_profile_request, ProfileRequestError, ProfilerBusy
+from server.workers import setup_worker, shutdown_worker, worker_count
+from config import BACKEND_URL, CORS_ORIGINS, PROFILING_ENABLED, PROFILING_TOKEN
+
+def create_http_app(mcp: FastMCP) -> FastAPI:
+    """Construir el wrapper HTTP sobre el servidor MCP indicado"""
+    # Pequeño wrapper HTTP compatible con /health y /tools
+    # El app MCP se crea antes para compartir su lifespan (inicializa el session manager)
+    # Con varios workers las sesiones MCP no se comparten entre procesos: cada
+    # petición a /mcp debe poder atenderla cualquier worker (modo sin estado)
+    mcp_app = mcp.http_app(stateless_http=worker_count() > 1)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Se ejecuta en cada worker ya arrancado (tras el fork con gunicorn --preload)
+        setup_worker()
+        try:
+            async with mcp_app.lifespan(app):
+                yield
+        finally:
+            await shutdown_worker()
+
+    http_app = FastAPI(title="FastMCP HTTP Wrapper", lifespan=lifespan)
+    http_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Las mismas funciones que expone MCP (registro único de main.py), no FunctionTool:
+    # el controlador de admisión distingue así las herramientas asíncronas de las
+    # bloqueantes (que van al executor)
+    TOOL_MAP = tool_registry.functions()
+
+    async def run_tool(tool_name: str, func, user_id: str = None, **kwargs):
+        """Ejecutar bajo control de admisión midiendo la llamada (transporte http) como `user_id`"""
+        with tenant_scope(user_id), track_tool_call(tool_name, "http") as call:
+            # Argumentos inválidos: se rechazan antes de ocupar hueco de admisión o contactar al backend
+            tool_registry.validate(tool_name, kwargs)
+            result = await admission.run(tool_name, func, **kwargs)
+            call.error = isinstance(result, dict) and "error" in result
+            if call.error:
+                mark_error()
+            return result
+
+    def request_user(request: Request, payload: dict = None):
+        """
+        Usuario de la llamada: argumento `user_id` o, si no viene, cabecera X-User-Id
+
+        Se retira `user_id` de los argumentos porque las herramientas no lo reciben:
+        lo leen del contexto (tools.tenant). Sin ninguno de los dos se usa DEFAULT_USER_ID.
+        """
+        user_id = payload.pop("user_id", None) if isinstance(payload, dict) else None
+        user_id = user_id or request.headers.get("x-user-id")
+        return None if user_id is None else validate_user_id(user_id)
+
+    @http_app.get("/health")
+    async def health():
+        return {
+            "status": "healthy",
+            "backend_url": BACKEND_URL,
+            "worker": {"pid": os.getpid(), "workers": worker_count()},
+            "admission": admission.get_stats(),
+            "cache": response_cache.get_stats(),
+            "single_flight": single_flight.get_stats(),
+            "summaries": summary_engine.get_stats(),
+            "availability": availability_index.get_stats(),
+            "backend": backend.get_stats(),
+            "validation": tool_registry.get_stats(),
+            "tracing": tracer.get_stats(),
+        }
+
+    @http_app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+    @http_app.get("/traces/slow")
+    async def slow_traces():
+        """Llamadas recientes por encima de TRACE_SLOW_THRESHOLD_MS con su desglose por etapas"""
+        return {"threshold_ms": tracer.slow_threshold_ms, "calls": tracer.recent_slow_calls()}
+
+    if PROFILING_ENABLED:
+        @http_app.post("/admin/profile")
+        async def profile(request: Request):
+            """Perfilar este worker durante N segundos o las N siguientes llamadas (ver server.profiling)"""
+            if not PROFILING_TOKEN:
+                return JSONResponse(status_code=403, content={"error": "PROFILING_TOKEN no configurado"})
+            if not hmac.compare_digest(request.headers.get("x-admin-token", ""), PROFILING_TOKEN):
+                return JSONResponse(status_code=403, content={"error": "X-Admin-Token inválido"})
+            try:
+                body = await request.body()
+                options = parse_profile_request(await request.json() if body else {})
+            except ProfileRequestError as invalid:
+                return JSONResponse(status_code=400, content={"error": str(invalid)})
+            except Exception:
+                return JSONResponse(status_code=400, content={"error": "Cuerpo JSON inválido"})
+            try:
+                return await profiler.run(options)
+            except ProfilerBusy as busy:
+                return JSONResponse(status_code=409, content={"error": str(busy)})
+
+    @http_app.get("/tools")
+    async def list_tools():
+        return {"tools": list(TOOL_MAP.keys())}
+
+    # Debe declararse antes de /tools/{tool_name} para que "batch" no se trate como herramienta
+    @http_app.post("/tools/batch")
+    async def call_tools_batch(request: Request):
+        try:
+            calls = parse_batch(await request.json(), TOOL_MAP)
+            header_user = request_user(request)
+        except (BatchError, InvalidUserId) as be:
+            return JSONResponse(status_code=400, content={"error": str(be)})
+        except Exception:
+            return JSONResponse(status_code=400, content={"error": "Cuerpo JSON inválido"})
+
+        async def run_as_user(tool_name: str, func, **kwargs):
+            # Cada llamada puede indicar su propio user_id; si no, el de la cabecera
+            user_id = kwargs.pop("user_id", None) or header_user
+            with tracer.trace_call(tool_name, "http", {"batch": True}):
+                return await run_tool(tool_name, func, user_id=user_id, **kwargs)
+
+        return StreamingResponse(
+            stream_ndjson(run_batch(calls, TOOL_MAP, run_as_user)),
+            media_type="application/x-ndjson",
+        )
+
+    # Listados con modo streaming: herramienta → (generador de elementos, colección)
+    STREAM_MAP = {
+        "list_tasks": (task_tools.stream_tasks, "tasks"),
+        "list_appointments": (appointment_tools.stream_appointments, "appointments"),
+    }
+
+    @http_app.post("/tools/{tool_name}/stream")
+    async def call_tool_stream(tool_name: str, request: Request):
+        if tool_name not in STREAM_MAP:
+            return JSONResponse(status_code=404, content={"error": f"Tool '{tool_name}' no admite streaming"})
+        # La traza llega hasta el primer elemento: el resto del cuerpo se envía después
+        with tracer.trace_call(tool_name, "http", {"stream": True}):
+            response = await open_stream(tool_name, request)
+            set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 400:
+                mark_error()
+            return response
+
+    async def open_stream(tool_name: str, request: Request):
+        with stage("parse"):
+            try:
+                payload = await request.json()
+            except Exception:
+                payload = {}
+            try:
+                user_id = request_user(request, payload)
+            except InvalidUserId as invalid:
+                return JSONResponse(status_code=400, content={"error": str(invalid)})
+        try:
+            tool_registry.validate(tool_name, payload)
+        except ToolArgumentError as invalid:
+            return JSONResponse(status_code=400, content={"error": str(invalid)})
+        stream, collection = STREAM_MAP[tool_name]
+        resources = AsyncExitStack()
+        # Como en /tools/{tool_name}, el plazo cuenta desde la llegada (incluida la
+        # cola de admisión) hasta el primer elemento, cuando se envían las cabeceras
+        with deadline_scope():
+            try:
+                # El hueco de admisión se conserva hasta terminar de enviar el cuerpo
+                await resources.enter_async_context(admission.slot(tool_name))
+            except AdmissionRejected as rejected:
+                return JSONResponse(
+                    status_code=rejected.status_code,
+                    content={"error": str(rejected)},
+                    headers={"Retry-After": str(rejected.retry_after)},
+                )
+            call = resources.enter_context(track_tool_call(tool_name, "http"))
+            try:
+                # El usuario solo se consulta al abrir el listado (parámetros, caché y
+                # turno en el backend), que ocurre al leer el primer elemento
+                with tenant_scope(user_id) as user:
+                    set_attribute("user.id", user)
+                    items = stream(**payload)
+                    first = await first_item(items)
+            except Exception as e:
+                call.error = True
+                await resources.aclose()
+                if isinstance(e, (TypeError, InvalidFields)):
+                    return JSONResponse(status_code=400, content={"error": str(e)})
+                status_code = 502 if isinstance(e, (httpx.HTTPError, ValueError)) else 500
+                return JSONResponse(status_code=status_code,
+                                    content={"error": f"Error en el streaming de {tool_name}: {e}"})
+        return StreamingResponse(
+            stream_json_list(collection, items, first, resources, call),
+            media_type="application/json",
+        )
+
+    @http_app.post("/tools/{tool_name}")
+    async def call_tool(tool_name: str, request: Request):
+        if tool_name not in TOOL_MAP:
+            return JSONResponse(status_code=404, content={"error": f"Tool '{tool_name}' not found"})
+        # La traza incluye la lectura del cuerpo y la serialización de la respuesta
+        with tracer.trace_call(tool_name, "http"):
+            response = await dispatch_tool(tool_name, request)
+            set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 400:
+                mark_error()
+            return response
+
+    async def dispatch_tool(tool_name: str, request: Request):
+        with stage("parse"):
+            try:
+                payload = await request.json()
+            except Exception:
+                payload = {}
+            try:
+                user_id = request_user(request, payload)
+            except InvalidUserId as invalid:
+                return JSONResponse(status_code=400, content={"error": str(invalid)})
+        try:
+            # El plazo cuenta desde la llegada: incluye la espera en cola
+            with deadline_scope():
+                result = await run_tool(tool_name, TOOL_MAP[tool_name], user_id=user_id, **payload)
+            return FastJSONResponse(result)
+        except AdmissionRejected as rejected:
+            return JSONResponse(
+                status_code=rejected.status_code,
+                content={"error": str(rejected)},
+                headers={"Retry-After": str(rejected.retry_after)},
+            )
+        except (ToolArgumentError, TypeError) as invalid:
+            return JSONResponse(status_code=400, content={"error": str(invalid)})
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"error": str(e)})
+
+    # También montamos el app nativo HTTP de FastMCP bajo /mcp para Cursor
+    http_app.mount("/mcp", mcp_app)
+
+    return http_app
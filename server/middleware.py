@@ -0,0 +1,75 @@
+"""Middleware FastMCP aplicado a las llamadas de herramientas del transporte MCP"""
+from fastmcp.exceptions import ToolError
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware
+from tools.deadline import deadline_scope
+from tools.tenant import tenant_scope, validate_user_id, InvalidUserId
+from tools.metrics import track_tool_call
+from tools.registry import tool_registry, ToolArgumentError
+from tools.tracing import tracer, mark_error
+
+class TracingMiddleware(Middleware):
+    """
+    Traza cada llamada MCP con su desglose por etapas (tools.tracing)
+
+    La lectura del mensaje JSON-RPC ocurre antes del middleware y no se
+    incluye; la validación de argumentos de FastMCP y la conversión del
+    resultado se atribuyen a parse y serialize.
+    """
+
+    async def on_call_tool(self, context, call_next):
+        with tracer.trace_call(tool_registry.label(context.message.name), "mcp") as trace:
+            result = await call_next(context)
+            content = getattr(result, "structured_content", None)
+            if isinstance(content, dict) and "error" in content:
+                mark_error()
+            if trace is not None:
+                trace.attribute_framework_time()
+            return result
+
+class DeadlineMiddleware(Middleware):
+    """Abre el plazo de la invocación (AGENT_TIMEOUT) al llegar cada llamada MCP"""
+
+    async def on_call_tool(self, context, call_next):
+        with deadline_scope():
+            return await call_next(context)
+
+class MetricsMiddleware(Middleware):
+    """Mide cada llamada MCP (contador, errores, latencia y en curso)"""
+
+    async def on_call_tool(self, context, call_next):
+        with track_tool_call(tool_registry.label(context.message.name), "mcp") as call:
+            result = await call_next(context)
+            content = getattr(result, "structured_content", None)
+            call.error = isinstance(content, dict) and "error" in content
+            return result
+
+class TenantMiddleware(Middleware):
+    """
+    Establece el usuario de cada llamada MCP
+
+    Se toma del argumento `user_id` (que se retira antes de validar los
+    argumentos de la herramienta) o de la cabecera X-User-Id en el transporte
+    HTTP. En stdio, sin ninguno de los dos, se usa DEFAULT_USER_ID.
+    """
+
+    async def on_call_tool(self, context, call_next):
+        arguments = context.message.arguments or {}
+        user_id = arguments.pop("user_id", None) or get_http_headers().get("x-user-id")
+        if user_id is not None:
+            try:
+                validate_user_id(user_id)
+            except InvalidUserId as invalid:
+                raise ToolError(str(invalid)) from None
+        with tenant_scope(user_id):
+            return await call_next(context)
+
+class ValidationMiddleware(Middleware):
+    """Rechaza argumentos inválidos con el validador del registro, antes de ejecutar la herramienta"""
+
+    async def on_call_tool(self, context, call_next):
+        try:
+            tool_registry.validate(context.message.name, context.message.arguments or {})
+        except ToolArgumentError as invalid:
+            raise ToolError(str(invalid)) from None
+        return await call_next(context)
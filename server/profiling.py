@@ -0,0 +1,218 @@
+"""Perfilado bajo demanda del proceso en marcha (POST /admin/profile)"""
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import sysconfig
+import threading
+import tracemalloc
+from collections import Counter
+from time import perf_counter
+from config import PROFILING_MAX_SECONDS, PROFILING_MAX_CALLS
+from tools.metrics import tool_calls
+
+# Raíz del proyecto: las asignaciones de tracemalloc se limitan a sus módulos
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STDLIB = sysconfig.get_paths()["stdlib"]
+_TOOL_LAYER = (
+    os.path.join(ROOT, "tools", "*"),
+    os.path.join(ROOT, "server", "*"),
+    os.path.join(ROOT, "main.py"),
+)
+
+MODES = ("sampling", "cprofile")
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+class ProfileRequestError(ValueError):
+    """Parámetros de perfilado no válidos"""
+
+class ProfilerBusy(Exception):
+    """Ya hay una sesión de perfilado en curso en este proceso"""
+
+def _frame_label(code) -> str:
+    """Nombre de un marco para pilas colapsadas: función (ruta:línea) sin ';'"""
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(ROOT) or path.startswith(STDLIB):
+        path = os.path.relpath(path, ROOT if path.startswith(ROOT) else STDLIB)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+class StackSampler(threading.Thread):
+    """
+    Muestrea cada `interval` segundos la pila de todos los hilos del proceso
+
+    Acumula pilas colapsadas (`hilo;marco;marco N`), el formato que aceptan
+    flamegraph.pl, speedscope o inferno. El muestreo solo lee los marcos: el
+    coste para el event loop es el del GIL durante cada muestra.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        """Detener y esperar al hilo (hasta un intervalo): llamar fuera del event loop"""
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+def parse_profile_request(payload: dict) -> dict:
+    """Validar y completar los parámetros de una sesión"""
+    if not isinstance(payload, dict):
+        raise ProfileRequestError("El cuerpo debe ser un objeto JSON")
+    mode = payload.get("mode", "sampling")
+    if mode not in MODES:
+        raise ProfileRequestError(f"mode debe ser uno de: {', '.join(MODES)}")
+    seconds = payload.get("seconds")
+    calls = payload.get("calls")
+    if seconds is not None and calls is not None:
+        raise ProfileRequestError("Indicar seconds o calls, no ambos")
+    if calls is not None:
+        if isinstance(calls, bool) or not isinstance(calls, int) or not 1 <= calls <= PROFILING_MAX_CALLS:
+            raise ProfileRequestError(f"calls debe ser un entero entre 1 y {PROFILING_MAX_CALLS}")
+    else:
+        seconds = 10 if seconds is None else seconds
+        if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or not 0 < seconds <= PROFILING_MAX_SECONDS:
+            raise ProfileRequestError(f"seconds debe estar entre 0 y {PROFILING_MAX_SECONDS}")
+    interval_ms = payload.get("interval_ms", 5)
+    if isinstance(interval_ms, bool) or not isinstance(interval_ms, (int, float)) or not 1 <= interval_ms <= 1000:
+        raise ProfileRequestError("interval_ms debe estar entre 1 y 1000")
+    sort = payload.get("sort", "cumulative")
+    if sort not in SORT_KEYS:
+        raise ProfileRequestError(f"sort debe ser uno de: {', '.join(SORT_KEYS)}")
+    top = payload.get("top", 30)
+    if isinstance(top, bool) or not isinstance(top, int) or not 1 <= top <= 500:
+        raise ProfileRequestError("top debe ser un entero entre 1 y 500")
+    memory = payload.get("tracemalloc", False)
+    if not isinstance(memory, bool):
+        raise ProfileRequestError("tracemalloc debe ser un booleano")
+    return {"mode": mode, "seconds": seconds, "calls": calls, "interval_ms": interval_ms,
+            "sort": sort, "top": top, "tracemalloc": memory}
+
+class Profiler:
+    """
+    Una sesión de perfilado a la vez sobre el proceso que atiende la petición
+
+    - cprofile: perfilador determinista del hilo del event loop (donde se
+      ejecutan las herramientas asíncronas); devuelve la tabla de pstats.
+    - sampling: muestreo de pilas de todos los hilos; devuelve pilas colapsadas.
+
+    La sesión dura `seconds` o hasta completar `calls` llamadas a herramientas
+    más (como mucho PROFILING_MAX_SECONDS). Con `tracemalloc` se añade el top
+    de memoria asignada durante la sesión en tools/, server/ y main.py.
+    """
+
+    def __init__(self, max_seconds: float = PROFILING_MAX_SECONDS):
+        self.max_seconds = max_seconds
+        self.sessions = 0
+        self._busy = False
+
+    async def _wait(self, seconds: float, calls: int) -> int:
+        """Esperar la duración o las llamadas pedidas; devuelve las llamadas completadas"""
+        started = tool_calls.total()
+        if calls is None:
+            await asyncio.sleep(seconds)
+        else:
+            deadline = perf_counter() + self.max_seconds
+            while tool_calls.total() - started < calls and perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+        return int(tool_calls.total() - started)
+
+    async def run(self, options: dict) -> dict:
+        if self._busy:
+            raise ProfilerBusy("Ya hay una sesión de perfilado en curso")
+        self._busy = True
+        self.sessions += 1
+        memory = options["tracemalloc"]
+        started_tracing = memory and not tracemalloc.is_tracing()
+        try:
+            if started_tracing:
+                tracemalloc.start()
+            baseline = tracemalloc.take_snapshot() if memory else None
+            started = perf_counter()
+            if options["mode"] == "cprofile":
+                deterministic = cProfile.Profile()
+                deterministic.enable()
+                try:
+                    calls = await self._wait(options["seconds"], options["calls"])
+                finally:
+                    deterministic.disable()
+                output = io.StringIO()
+                pstats.Stats(deterministic, stream=output).sort_stats(options["sort"]).print_stats(options["top"])
+                result = {"format": "pstats", "profile": output.getvalue()}
+            else:
+                sampler = StackSampler(options["interval_ms"] / 1000)
+                sampler.start()
+                try:
+                    calls = await self._wait(options["seconds"], options["calls"])
+                finally:
+                    # join() bloquearía el event loop hasta `interval_ms`
+                    await asyncio.to_thread(sampler.stop)
+                result = {"format": "collapsed", "samples": sampler.samples, "profile": sampler.collapsed()}
+            result = {
+                "mode": options["mode"],
+                "pid": os.getpid(),
+                "duration_s": round(perf_counter() - started, 3),
+                "tool_calls": calls,
+                **result,
+            }
+            if memory:
+                result["allocations"] = self._allocations(baseline, options["top"])
+            return result
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self._busy = False
+
+    @staticmethod
+    def _allocations(baseline, top: int) -> dict:
+        """Top-N de líneas de la capa de herramientas por memoria asignada durante la sesión"""
+        current, peak = tracemalloc.get_traced_memory()
+        # Sin las asignaciones del propio perfilado (pilas muestreadas, tablas de pstats)
+        filters = [tracemalloc.Filter(True, pattern) for pattern in _TOOL_LAYER]
+        filters.append(tracemalloc.Filter(False, os.path.abspath(__file__)))
+        snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+        differences = snapshot.compare_to(baseline.filter_traces(filters), "lineno")
+        return {
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": [
+                {
+                    "location": f"{os.path.relpath(stat.traceback[0].filename, ROOT)}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in differences[:top]
+            ],
+        }
+
+    def get_stats(self) -> dict:
+        return {"sessions": self.sessions, "running": self._busy}
+
+# Instancia global (por proceso)
+profiler = Profiler()
@@ -0,0 +1,31 @@
+"""Respuestas JSON del wrapper HTTP sin pasar por jsonable_encoder"""
+from starlette.responses import Response
+from tools.fast_json import dumps, raw_body
+from tools.metrics import registry
+from tools.tracing import stage
+
+json_responses = registry.counter("http_json_responses_total",
+                                  "Respuestas JSON de /tools por modo (passthrough = cuerpo original del backend)",
+                                  ("mode",))
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON que reenvía el cuerpo del backend cuando no se ha modificado
+
+    En otro caso codifica con tools.fast_json (orjson si está instalado). Se
+    devuelve directamente desde las rutas: si la ruta devolviera el dict,
+    FastAPI lo copiaría con jsonable_encoder antes de llegar aquí.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        raw = raw_body(content)
+        if raw is not None:
+            json_responses.inc("passthrough")
+            return raw
+        json_responses.inc("encoded")
+        with stage("serialize") as span:
+            body = dumps(content)
+            span.set("bytes", len(body))
+        return body
@@ -0,0 +1,56 @@
+"""Listados en streaming para el wrapper HTTP (POST /tools/{tool_name}/stream)"""
+from tools.fast_json import dumps
+
+# Centinela: el listado no tiene ningún elemento
+END = object()
+
+# Bytes aproximados acumulados antes de enviar un trozo del cuerpo
+CHUNK_SIZE = 16 * 1024
+
+async def first_item(items):
+    """
+    Leer el primer elemento antes de enviar las cabeceras
+
+    Así los errores al abrir el listado (backend caído, circuito abierto)
+    se responden con su código HTTP en lugar de a mitad del cuerpo.
+    """
+    try:
+        return await items.__anext__()
+    except StopAsyncIteration:
+        return END
+
+async def stream_json_list(collection: str, items, first, resources, call=None):
+    """
+    Serializar `{"<collection>": [...], "total": n}` elemento a elemento
+
+    El cuerpo tiene la misma forma que la respuesta sin streaming. Si el
+    listado falla a mitad, se cierra el JSON con un campo "error". Al terminar
+    se liberan `resources` (AsyncExitStack con el hueco de admisión y la medición).
+    """
+    count = 0
+    pending = [b"{" + dumps(collection) + b":["]
+    size = 0
+    try:
+        try:
+            if first is not END:
+                pending.append(dumps(first))
+                count = 1
+                async for item in items:
+                    encoded = dumps(item)
+                    pending.append(b"," + encoded)
+                    count += 1
+                    size += len(encoded)
+                    # Agrupar elementos pequeños en trozos: cada envío tiene un coste fijo
+                    if size >= CHUNK_SIZE:
+                        yield b"".join(pending)
+                        pending.clear()
+                        size = 0
+            pending.append(b'],"total":%d}' % count)
+        except Exception as e:
+            if call is not None:
+                call.error = True
+            pending.append(b'],"total":%d,"error":%s}' % (count, dumps(f"Listado interrumpido: {e}")))
+        yield b"".join(pending)
+    finally:
+        await items.aclose()
+        await resources.aclose()
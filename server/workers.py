@@ -0,0 +1,40 @@
+"""Preparación por proceso del wrapper HTTP cuando se sirve con varios workers"""
+import os
+from config import MCP_WORKERS, CACHE_TTL
+from tools.backend_client import backend
+from tools.singleflight import single_flight
+from tools.summary import summary_engine
+from tools.interval_index import availability_index
+from tools.tracing import tracer
+from server.admission import admission
+
+def worker_count(configured: int = MCP_WORKERS) -> int:
+    """Número de procesos a lanzar: MCP_WORKERS, o uno por núcleo si es 0"""
+    if configured > 0:
+        return configured
+    return os.cpu_count() or 1
+
+def setup_worker(workers: int = None):
+    """
+    Preparar el estado del proceso que va a servir peticiones
+
+    Se llama al arrancar cada worker (lifespan), después del fork: el pool
+    hacia el backend, los semáforos de admisión y las peticiones en curso
+    quedan ligados al event loop y a los hilos del proceso que los creó.
+    """
+    workers = worker_count() if workers is None else workers
+    backend.reset()
+    admission.reset()
+    single_flight.reset()
+    tracer.reset()
+    if workers > 1:
+        # Cachés e índices son por proceso: las escrituras atendidas por otro
+        # worker solo se ven aquí al resincronizar, así que se acotan al TTL
+        summary_engine.resync_interval = min(summary_engine.resync_interval, CACHE_TTL)
+        availability_index.resync_interval = min(availability_index.resync_interval, CACHE_TTL)
+
+async def shutdown_worker():
+    """Cerrar el pool del backend, los hilos del executor y los ficheros de trazas al parar el worker"""
+    await backend.aclose()
+    admission.shutdown()
+    tracer.close()
@@ -0,0 +1,64 @@
+"""El plazo agotado de quien llama no abre el circuit breaker del backend"""
+import asyncio
+import unittest
+import httpx
+from tools.backend_client import BackendClient
+from tools.circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN, CLOSED
+from tools.deadline import deadline_scope, DeadlineExceeded, BudgetExhausted
+from tools.tenant import tenant_scope
+
+def make_client(delay: float, timeout: float = 5.0, tenant_concurrency: int = 20) -> BackendClient:
+    """Cliente contra un backend simulado que responde 200 tras `delay` segundos"""
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"tasks": []})
+
+    client = BackendClient(timeout=timeout, hedge_enabled=False)
+    client.scheduler.tenant_concurrency = tenant_concurrency
+    client.breakers["tasks"] = CircuitBreaker("tasks", failure_threshold=3, reset_timeout=60)
+    client._client = httpx.AsyncClient(base_url="http://backend/api/v1", transport=httpx.MockTransport(handler))
+    client._loop = asyncio.get_running_loop()
+    return client
+
+async def call(client: BackendClient, user_id: str, budget: float = None):
+    """Resultado de un GET: "ok" o el tipo de excepción"""
+    with tenant_scope(user_id):
+        try:
+            if budget is None:
+                await client.get("/tasks/")
+            else:
+                with deadline_scope(budget):
+                    await client.get("/tasks/")
+            return "ok"
+        except httpx.HTTPError as e:
+            return type(e)
+
+class BudgetDoesNotOpenCircuitTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_short_caller_budgets_do_not_open_circuit(self):
+        # Backend sano (50 ms) y cada llamada con solo 20 ms de plazo
+        client = make_client(delay=0.05)
+        results = await asyncio.gather(*(call(client, "impatient", budget=0.02) for _ in range(5)))
+        self.assertEqual(results, [BudgetExhausted] * 5)
+        self.assertEqual(client.breakers["tasks"].state, CLOSED)
+        self.assertEqual(await call(client, "other"), "ok")
+
+    async def test_queue_wait_timeouts_do_not_open_circuit(self):
+        # Un usuario ruidoso con una sola petición simultánea agota su plazo en su propia cola
+        client = make_client(delay=0.05, tenant_concurrency=1)
+        results = await asyncio.gather(*(call(client, "noisy", budget=0.08) for _ in range(10)))
+        self.assertIn("ok", results)
+        self.assertTrue(all(result in ("ok", BudgetExhausted) for result in results))
+        self.assertEqual(client.breakers["tasks"].state, CLOSED)
+        self.assertEqual(await call(client, "other"), "ok")
+
+    async def test_backend_timeouts_still_open_circuit(self):
+        # Sin plazo de quien llama el timeout es REQUEST_TIMEOUT: agotarlo sí es fallo del backend
+        # (un GET se reintenta: sus intentos bastan para llegar al umbral de 3 fallos)
+        client = make_client(delay=0.2, timeout=0.02)
+        self.assertIn(await call(client, "user"), (DeadlineExceeded, CircuitOpenError))
+        self.assertEqual(client.breakers["tasks"].state, OPEN)
+        self.assertEqual(await call(client, "other"), CircuitOpenError)
+
+if __name__ == "__main__":
+    unittest.main()
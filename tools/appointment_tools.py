@@ -1,22 +1,34 @@
 """Herramientas MCP para gestión de citas según requerimientos del documento"""
-import os
-import requests
+import httpx
 from typing import List, Optional
 from datetime import datetime, timedelta
-from pydantic import BaseModel
-
-# URL del backend API
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8002") + "/api/v1"
+from config import AVAILABILITY_BACKEND_FALLBACK, RECURRENCE_MAX_OCCURRENCES, FREE_SLOTS_MAX_DAYS
+from tools.tenant import current_user_id
+from tools.backend_client import backend
+from tools.cache import response_cache, cache_key, MISS
+from tools.summary import summary_engine
+from tools.singleflight import single_flight
+from tools.interval_index import availability_index, IntervalIndex
+from tools.timeutils import to_timestamp, parse_iso
+from tools.recurrence import parse_rrule, occurrences, RecurrenceError
+from tools.free_slots import parse_working_hours, working_windows, sweep_free, WorkingHoursError
+from tools.pagination import paginate, InvalidCursor
+from tools.json_stream import iter_items
+from tools.fast_json import decode_response
+from tools.projection import parse_fields, project_item, shape_listing, InvalidFields
+from tools.bulk import run_bulk, require_object
+from tools.registry import tool_registry
 
 class AppointmentTool:
     """Herramientas MCP para citas según el documento de requerimientos"""
     
     @staticmethod
-    def schedule_appointment(title: str, start_time: str, duration_minutes: int = 60, description: str = "", location: str = "", participants: List[dict] = None) -> dict:
+    async def schedule_appointment(title: str, start_time: str, duration_minutes: int = 60, description: str = "", location: str = "", participants: List[dict] = None) -> dict:
         """
         Programar una nueva cita
         Herramienta MCP según el documento de requerimientos
         """
+        user_id = current_user_id()
         if participants is None:
             participants = []
         
@@ -34,72 +46,146 @@ class AppointmentTool:
                 "participants": participants
             }
             
-            response = requests.post(
-                f"{BACKEND_URL}/appointments/",
+            response = await backend.post(
+                "/appointments/",
                 json=appointment_data,
-                params={"user_id": "default-user"},
-                timeout=5
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            appointment = decode_response(response)
+            summary_engine.record_upsert("appointments", user_id, None, appointment, created=True)
+            availability_index.record_upsert(user_id, None, appointment, created=True)
+            return appointment
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("appointments", user_id)
+            availability_index.mark_dirty(user_id)
             return {"error": f"Error al programar cita: {str(e)}"}
         except ValueError as e:
             return {"error": f"Formato de fecha inválido: {str(e)}"}
+        finally:
+            response_cache.invalidate("appointments", user_id)
     
     @staticmethod
-    def check_availability(start_time: str, end_time: str) -> dict:
+    async def check_availability(start_time: str, end_time: str) -> dict:
         """
         Verificar disponibilidad de horario
         Herramienta MCP según el documento de requerimientos
+        Con AVAILABILITY_LOCAL se responde desde el índice de intervalos en memoria
         """
+        user_id = current_user_id()
+        if availability_index.enabled:
+            try:
+                start, end = to_timestamp(start_time), to_timestamp(end_time)
+            except ValueError as e:
+                return {"error": f"Formato de fecha inválido: {str(e)}"}
+            index = await availability_index.get_index(user_id, AppointmentTool.list_appointments)
+            if isinstance(index, IntervalIndex):
+                conflicts = index.overlapping(start, end)
+                availability_index.local_answers += 1
+                return {"available": not conflicts, "conflicts": conflicts, "source": "local"}
+            if not AVAILABILITY_BACKEND_FALLBACK:
+                return index
+        
         try:
             availability_data = {
                 "start_time": start_time,
                 "end_time": end_time
             }
             
-            response = requests.post(
-                f"{BACKEND_URL}/appointments/check-availability",
+            response = await backend.post(
+                "/appointments/check-availability",
                 json=availability_data,
-                params={"user_id": "default-user"},
-                timeout=5
+                params={"user_id": user_id},
+                idempotent=True
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return decode_response(response)
+        except httpx.HTTPError as e:
             return {"error": f"Error al verificar disponibilidad: {str(e)}"}
     
     @staticmethod
-    def list_appointments(date: str = None, status: str = None) -> dict:
+    async def list_appointments(date: str = None, status: str = None,
+                                limit: int = None, cursor: str = None, fields=None, compact: bool = False) -> dict:
         """
         Listar citas con filtro de fecha opcional
         Herramienta MCP según el documento de requerimientos
+        Con `limit`/`cursor` devuelve una página y `next_cursor` para la siguiente
+        Con `fields` solo se devuelven esos campos; con `compact` la lista va por columnas
+        """
+        try:
+            fields = parse_fields(fields)
+        except InvalidFields as e:
+            return {"error": str(e)}
+        params = AppointmentTool._list_params(date, status)
+        key = cache_key("appointments", params)
+        data = response_cache.get(key)
+        if data is MISS:
+            # Lecturas idénticas concurrentes comparten una sola petición al backend
+            data = await single_flight.do(key, lambda: AppointmentTool._fetch_appointments(params, key))
+        if "error" in data:
+            return data
+        try:
+            page = paginate(data, "appointments", limit, cursor)
+        except InvalidCursor as e:
+            return {"error": str(e)}
+        # La caché guarda registros completos (los comparten resúmenes, el índice
+        # de disponibilidad y otras proyecciones): solo se recorta la página devuelta
+        return shape_listing(page, "appointments", fields, compact)
+    
+    @staticmethod
+    async def stream_appointments(date: str = None, status: str = None, fields=None):
+        """
+        Producir las citas una a una según se decodifican de la respuesta del backend
+        Usado por el modo streaming del wrapper HTTP: la memoria no crece con el listado
+        Con `fields` cada cita se recorta nada más decodificarla
         """
-        params = {"user_id": "default-user"}
+        fields = parse_fields(fields)
+        params = AppointmentTool._list_params(date, status)
+        cached = response_cache.get(cache_key("appointments", params))
+        if cached is not MISS:
+            for appointment in cached.get("appointments", []):
+                yield project_item(appointment, fields)
+            return
+        async with backend.stream("GET", "/appointments/", params=params) as response:
+            response.raise_for_status()
+            async for appointment in iter_items(response.aiter_bytes(), "appointments"):
+                yield project_item(appointment, fields)
+    
+    @staticmethod
+    def _list_params(date: str = None, status: str = None) -> dict:
+        params = {"user_id": current_user_id()}
         
         if date:
             params["date_filter"] = date
         if status:
             params["status"] = status
+        return params
+    
+    @staticmethod
+    async def _fetch_appointments(params: dict, key: tuple) -> dict:
+        """Descargar el listado del backend y guardarlo en caché"""
+        generation = response_cache.generation("appointments", params["user_id"])
         
         try:
-            response = requests.get(
-                f"{BACKEND_URL}/appointments/",
-                params=params,
-                timeout=5
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            # GET condicional: si el listado no cambió (304) se reutiliza el ya decodificado
+            data, size = await backend.conditional_get("/appointments/", params=params, decode=decode_response,
+                                                       generation=generation)
+            response_cache.set(key, data, size, generation)
+            if len(params) == 1 and response_cache.generation("appointments", params["user_id"]) == generation:
+                # Un listado sin filtros sirve también para resincronizar el resumen
+                summary_engine.load("appointments", params["user_id"], data.get("appointments", []))
+                availability_index.load(params["user_id"], data.get("appointments", []))
+            return data
+        except httpx.HTTPError as e:
             return {"error": f"Error al listar citas: {str(e)}"}
     
     @staticmethod
-    def update_appointment(appointment_id: str, **updates) -> dict:
+    async def update_appointment(appointment_id: str, **updates) -> dict:
         """
         Actualizar una cita existente
         Herramienta MCP para modificar citas
         """
+        user_id = current_user_id()
         # Filtrar campos válidos
         valid_fields = ["title", "description", "start_time", "end_time", "status", "location", "participants"]
         appointment_updates = {k: v for k, v in updates.items() if k in valid_fields and v is not None}
@@ -108,84 +194,256 @@ class AppointmentTool:
             return {"error": "No se proporcionaron campos válidos para actualizar"}
         
         try:
-            response = requests.put(
-                f"{BACKEND_URL}/appointments/{appointment_id}",
+            response = await backend.put(
+                f"/appointments/{appointment_id}",
                 json=appointment_updates,
-                params={"user_id": "default-user"},
-                timeout=5
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            appointment = decode_response(response)
+            summary_engine.record_upsert("appointments", user_id, appointment_id, appointment)
+            availability_index.record_upsert(user_id, appointment_id, appointment)
+            return appointment
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("appointments", user_id)
+            availability_index.mark_dirty(user_id)
             return {"error": f"Error al actualizar cita: {str(e)}"}
+        finally:
+            # Una escritura fallida por timeout pudo aplicarse igualmente: invalidar siempre
+            response_cache.invalidate("appointments", user_id)
     
     @staticmethod
-    def delete_appointment(appointment_id: str) -> dict:
+    async def delete_appointment(appointment_id: str) -> dict:
         """
         Eliminar una cita
         Herramienta MCP para eliminar citas
         """
+        user_id = current_user_id()
         try:
-            response = requests.delete(
-                f"{BACKEND_URL}/appointments/{appointment_id}",
-                params={"user_id": "default-user"},
-                timeout=5
+            response = await backend.delete(
+                f"/appointments/{appointment_id}",
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            result = decode_response(response)
+            summary_engine.record_delete("appointments", user_id, appointment_id)
+            availability_index.record_delete(user_id, appointment_id)
+            return result
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("appointments", user_id)
+            availability_index.mark_dirty(user_id)
             return {"error": f"Error al eliminar cita: {str(e)}"}
+        finally:
+            # Una escritura fallida por timeout pudo aplicarse igualmente: invalidar siempre
+            response_cache.invalidate("appointments", user_id)
     
     @staticmethod
-    def get_appointment(appointment_id: str) -> dict:
+    async def get_appointment(appointment_id: str) -> dict:
         """
         Obtener una cita específica por ID
         Herramienta MCP para consultas detalladas
         """
+        user_id = current_user_id()
         try:
-            response = requests.get(
-                f"{BACKEND_URL}/appointments/{appointment_id}",
-                params={"user_id": "default-user"},
-                timeout=5
+            response = await backend.get(
+                f"/appointments/{appointment_id}",
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return decode_response(response)
+        except httpx.HTTPError as e:
             return {"error": f"Error al obtener cita: {str(e)}"}
     
     @staticmethod
-    def complete_appointment(appointment_id: str) -> dict:
+    async def complete_appointment(appointment_id: str) -> dict:
         """
         Marcar cita como completada
         Herramienta MCP de conveniencia
         """
+        user_id = current_user_id()
         try:
-            response = requests.post(
-                f"{BACKEND_URL}/appointments/{appointment_id}/complete",
-                params={"user_id": "default-user"},
-                timeout=5
+            response = await backend.post(
+                f"/appointments/{appointment_id}/complete",
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            appointment = decode_response(response)
+            summary_engine.record_upsert("appointments", user_id, appointment_id, appointment)
+            availability_index.record_upsert(user_id, appointment_id, appointment)
+            return appointment
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("appointments", user_id)
+            availability_index.mark_dirty(user_id)
             return {"error": f"Error al completar cita: {str(e)}"}
+        finally:
+            # Una escritura fallida por timeout pudo aplicarse igualmente: invalidar siempre
+            response_cache.invalidate("appointments", user_id)
     
     @staticmethod
-    def cancel_appointment(appointment_id: str) -> dict:
+    async def cancel_appointment(appointment_id: str) -> dict:
         """
         Cancelar una cita
         Herramienta MCP de conveniencia
         """
+        user_id = current_user_id()
         try:
-            response = requests.post(
-                f"{BACKEND_URL}/appointments/{appointment_id}/cancel",
-                params={"user_id": "default-user"},
-                timeout=5
+            response = await backend.post(
+                f"/appointments/{appointment_id}/cancel",
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            appointment = decode_response(response)
+            summary_engine.record_upsert("appointments", user_id, appointment_id, appointment)
+            availability_index.record_upsert(user_id, appointment_id, appointment)
+            return appointment
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("appointments", user_id)
+            availability_index.mark_dirty(user_id)
             return {"error": f"Error al cancelar cita: {str(e)}"}
+        finally:
+            # Una escritura fallida por timeout pudo aplicarse igualmente: invalidar siempre
+            response_cache.invalidate("appointments", user_id)
+
+    @staticmethod
+    async def schedule_appointments_bulk(appointments: List[dict]) -> dict:
+        """
+        Programar varias citas con peticiones concurrentes (hasta BULK_MAX_CONCURRENCY)
+        Cada elemento admite los mismos campos que schedule_appointment
+        """
+        async def schedule(item):
+            # Cada elemento con las reglas de schedule_appointment: uno inválido no llega al backend
+            tool_registry.validate("schedule_appointment", require_object(item, "title", "start_time"))
+            return await AppointmentTool.schedule_appointment(**item)
+        return await run_bulk(appointments, schedule, "appointments")
+
+    @staticmethod
+    async def schedule_recurring_appointment(title: str, start_time: str, rrule: str, duration_minutes: int = 60,
+                                             description: str = "", location: str = "",
+                                             participants: List[dict] = None, dry_run: bool = False) -> dict:
+        """
+        Programar una serie de citas según una regla RRULE (p.ej. FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10)
+        Todas las ocurrencias se comparan con la agenda en una sola pasada y solo
+        se crean las que no chocan, con escrituras concurrentes acotadas
+        Con `dry_run` solo se devuelve el informe de conflictos
+        """
+        user_id = current_user_id()
+        try:
+            first = parse_iso(start_time)
+            starts = list(occurrences(first, parse_rrule(rrule), RECURRENCE_MAX_OCCURRENCES))
+        except RecurrenceError as e:
+            return {"error": f"Regla de recurrencia inválida: {str(e)}"}
+        except ValueError as e:
+            return {"error": f"Formato de fecha inválido: {str(e)}"}
+        if not starts:
+            return {"error": "La regla no genera ninguna ocurrencia a partir de start_time"}
+
+        duration = timedelta(minutes=duration_minutes)
+        begins = [start.timestamp() for start in starts]
+        ends = [begin + duration.total_seconds() for begin in begins]
+        if any(following < end for following, end in zip(begins[1:], ends)):
+            return {"error": "La duración supera el intervalo entre ocurrencias: la serie se solaparía consigo misma"}
+
+        index = await AppointmentTool._agenda(user_id)
+        if not isinstance(index, IntervalIndex):
+            return index
+        conflicting = index.conflicts(begins, ends)
+        conflicts = [
+            {
+                "start_time": starts[position].isoformat(),
+                "end_time": (starts[position] + duration).isoformat(),
+                "conflicts_with": [
+                    {field: appointment.get(field) for field in ("id", "title", "start_time", "end_time")}
+                    for appointment in index.overlapping(begins[position], ends[position])
+                ],
+            }
+            for position in conflicting
+        ]
+        skipped = set(conflicting)
+        free = [start for position, start in enumerate(starts) if position not in skipped]
+        report = {
+            "rrule": rrule,
+            "occurrences": len(starts),
+            "conflicting": len(conflicts),
+            "conflicts": conflicts,
+        }
+        if dry_run:
+            return {**report, "dry_run": True, "available": [start.isoformat() for start in free]}
+
+        async def schedule(start):
+            return await AppointmentTool.schedule_appointment(
+                title, start.isoformat(), duration_minutes, description, location, participants
+            )
+        created, errors = [], []
+        if free:
+            outcome = await run_bulk(free, schedule, "occurrences", max_items=RECURRENCE_MAX_OCCURRENCES)
+            for result in outcome["results"]:
+                if result["status"] == "ok":
+                    created.append(result["result"])
+                else:
+                    errors.append({"start_time": free[result["index"]].isoformat(), "error": result["error"]})
+        return {**report, "scheduled": len(created), "failed": len(errors), "appointments": created, "errors": errors}
+
+    @staticmethod
+    async def find_free_slots(range_start: str, range_end: str, duration_minutes: int = 60,
+                              working_hours: str = None, limit: int = 10) -> dict:
+        """
+        Buscar huecos libres de al menos `duration_minutes` en un rango
+        Una sola lectura de la agenda: los tramos ocupados se fusionan y se barren
+        junto con las ventanas del horario laboral (p.ej. "MO-FR 09:00-18:00")
+        Cada hueco indica el primer inicio posible y hasta cuándo sigue libre
+        """
+        user_id = current_user_id()
+        try:
+            first, last = parse_iso(range_start), parse_iso(range_end)
+            hours = parse_working_hours(working_hours) if working_hours is not None else None
+        except WorkingHoursError as e:
+            return {"error": f"Horario laboral inválido: {str(e)}"}
+        except ValueError as e:
+            return {"error": f"Formato de fecha inválido: {str(e)}"}
+        if last <= first:
+            return {"error": "range_end debe ser posterior a range_start"}
+        if last - first > timedelta(days=FREE_SLOTS_MAX_DAYS):
+            return {"error": f"El rango no puede superar {FREE_SLOTS_MAX_DAYS} días"}
+
+        index = await AppointmentTool._agenda(user_id)
+        if not isinstance(index, IntervalIndex):
+            return index
+        busy = index.busy(first.timestamp(), last.timestamp())
+        duration = timedelta(minutes=duration_minutes)
+        gaps = sweep_free(busy, working_windows(first, last, hours), duration.total_seconds(), limit)
+        # Las fechas se devuelven en la zona de range_start, igual que se interpreta el horario
+        zone = first.tzinfo
+        slots = []
+        for gap_start, gap_end in gaps:
+            start = datetime.fromtimestamp(gap_start, zone)
+            slots.append({
+                "start_time": start.isoformat(),
+                "end_time": (start + duration).isoformat(),
+                "free_until": datetime.fromtimestamp(gap_end, zone).isoformat(),
+            })
+        return {"slots": slots, "count": len(slots), "busy_intervals": len(busy), "limit_reached": len(slots) >= limit}
+
+    @staticmethod
+    async def _agenda(user_id: str):
+        """Índice de intervalos con las citas del usuario, o el dict de error del listado"""
+        if availability_index.enabled:
+            return await availability_index.get_index(user_id, AppointmentTool.list_appointments)
+        # Sin índice compartido se construye uno temporal desde el listado (normalmente en caché)
+        data = await AppointmentTool.list_appointments()
+        if "error" in data:
+            return data
+        index = IntervalIndex()
+        index.load(data.get("appointments", []))
+        return index
+
+    @staticmethod
+    async def get_appointment_summary() -> dict:
+        """
+        Obtener resumen de citas por estado
+        Mantenido incrementalmente: solo descarga el listado al resincronizar
+        """
+        user_id = current_user_id()
+        return await summary_engine.get_summary("appointments", user_id, AppointmentTool.list_appointments)
 
 # Instancia global de herramientas de citas
 appointment_tools = AppointmentTool()
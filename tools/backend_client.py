@@ -0,0 +1,377 @@
+"""Cliente HTTP asíncrono compartido con pool de conexiones hacia el backend API"""
+import asyncio
+import random
+from collections import deque
+from contextlib import asynccontextmanager
+from time import perf_counter
+import httpx
+from config import (
+    BACKEND_URL, REQUEST_TIMEOUT,
+    BACKEND_POOL_SIZE, BACKEND_POOL_KEEPALIVE, BACKEND_KEEPALIVE_EXPIRY,
+    HEDGE_ENABLED, HEDGE_QUANTILE, HEDGE_MIN_SAMPLES, HEDGE_WINDOW, HEDGE_MIN_DELAY,
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+)
+from tools.circuit_breaker import CircuitBreaker
+from tools.deadline import remaining_budget, current_deadline, DeadlineExceeded, BudgetExhausted
+from tools.fair_scheduler import FairScheduler
+from tools.tenant import current_user_id
+from tools.revalidation import ValidatorStore, resource_key
+from tools.tracing import stage
+from tools.metrics import registry, backend_requests, backend_duration
+
+# URL base de la API del backend
+API_URL = BACKEND_URL + "/api/v1"
+
+# Respuestas del backend que se reintentan en operaciones idempotentes
+RETRYABLE_STATUS = {502, 503, 504}
+
+# Segmentos de ruta fijos; el resto de segmentos tras la colección son ids
+_STATIC_SEGMENTS = {"complete", "cancel", "check-availability"}
+
+def route_template(path: str) -> str:
+    """Plantilla de ruta sin ids, p.ej. /tasks/abc/complete -> /tasks/{id}/complete"""
+    parts = path.strip("/").split("/")
+    template = [parts[0]] + [part if part in _STATIC_SEGMENTS else "{id}" for part in parts[1:]]
+    return "/" + "/".join(template) + ("/" if path.endswith("/") else "")
+
+class LatencyTracker:
+    """Ventana deslizante de latencias por ruta para estimar el percentil de cobertura"""
+
+    # Recalcular el percentil como mucho cada N muestras: ordenar la ventana en cada petición no compensa
+    RECOMPUTE_EVERY = 16
+
+    def __init__(self, window: int = HEDGE_WINDOW, quantile: float = HEDGE_QUANTILE,
+                 min_samples: int = HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self._samples = {}
+        self._percentiles = {}  # ruta -> (muestras nuevas desde el cálculo, percentil)
+
+    def record(self, route: tuple, seconds: float):
+        samples = self._samples.get(route)
+        if samples is None:
+            samples = self._samples[route] = deque(maxlen=self.window)
+        samples.append(seconds)
+        cached = self._percentiles.get(route)
+        if cached is not None:
+            self._percentiles[route] = (cached[0] + 1, cached[1])
+
+    def percentile(self, route: tuple):
+        """Percentil observado o None si aún no hay muestras suficientes"""
+        samples = self._samples.get(route)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        cached = self._percentiles.get(route)
+        if cached is not None and cached[0] < self.RECOMPUTE_EVERY:
+            return cached[1]
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.quantile))]
+        self._percentiles[route] = (0, value)
+        return value
+
+class BackendClient:
+    """
+    Cliente del backend con conexiones keep-alive reutilizadas entre llamadas
+
+    El httpx.AsyncClient se crea en el primer uso y queda ligado al event loop
+    que lo creó; si el loop cambia (p.ej. varios asyncio.run en scripts) se
+    reconstruye para no reutilizar conexiones de un loop cerrado.
+
+    Cada petición se limita a lo que quede del plazo de la invocación
+    (tools.deadline) y las lecturas idempotentes pueden cubrirse con una
+    petición duplicada si la primera supera el p95 observado de su ruta.
+    Cada grupo de rutas (tasks, appointments) tiene su propio circuit breaker
+    y los huecos del pool se reparten por turnos entre usuarios (FairScheduler).
+    """
+
+    def __init__(self, base_url: str = API_URL, pool_size: int = BACKEND_POOL_SIZE,
+                 keepalive: int = BACKEND_POOL_KEEPALIVE, keepalive_expiry: float = BACKEND_KEEPALIVE_EXPIRY,
+                 timeout: float = REQUEST_TIMEOUT, hedge_enabled: bool = HEDGE_ENABLED):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.hedge_enabled = hedge_enabled
+        self.latencies = LatencyTracker()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.breakers = {}
+        self.scheduler = FairScheduler(capacity=pool_size)
+        self.validators = ValidatorStore()
+        self._client = None
+        self._loop = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente httpx con pool, creado bajo demanda en el loop actual"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+            )
+            self._loop = loop
+        return self._client
+
+    async def request(self, method: str, path: str, *, params: dict = None, json=None,
+                      headers: dict = None, idempotent: bool = None) -> httpx.Response:
+        """
+        Enviar una petición al backend reutilizando el pool de conexiones
+
+        Las operaciones idempotentes (por defecto solo GET) se reintentan con
+        backoff exponencial y jitter ante errores de red o 502/503/504, y
+        admiten peticiones de cobertura. Con el circuito del grupo abierto se
+        lanza CircuitOpenError sin contactar al backend. Solo cuentan como
+        fallo los errores de red, timeouts y 5xx del backend, no el plazo
+        agotado de quien llama (BudgetExhausted).
+        """
+        if idempotent is None:
+            idempotent = method == "GET"
+        template = route_template(path)
+        route = (method, template)
+        breaker = self._breaker(template)
+        attempts = 1 + (RETRY_MAX_ATTEMPTS if idempotent else 0)
+
+        for attempt in range(attempts):
+            # Sin presupuesto no se contacta al backend ni se cuenta como fallo suyo
+            remaining_budget(self.timeout)
+            breaker.before_request()
+            try:
+                if idempotent and self.hedge_enabled:
+                    response = await self._hedged(route, method, path, params, json, headers)
+                else:
+                    response = await self._send(route, method, path, params, json, headers)
+            except BudgetExhausted:
+                # Plazo de quien llama agotado (en cola o con el timeout recortado): el backend no ha fallado
+                breaker.release()
+                raise
+            except httpx.TransportError:
+                breaker.record_failure()
+                if attempt + 1 < attempts and await self._backoff(attempt):
+                    continue
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+
+            if response.status_code < 500:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if response.status_code in RETRYABLE_STATUS and attempt + 1 < attempts and await self._backoff(attempt):
+                continue
+            return response
+
+    @asynccontextmanager
+    async def stream(self, method: str, path: str, *, params: dict = None):
+        """
+        Abrir una petición cuyo cuerpo se lee por trozos (`response.aiter_bytes()`)
+
+        Pasa por el circuit breaker y las métricas, pero no se reintenta ni se
+        cubre: un cuerpo ya entregado en parte no se puede repetir. El timeout
+        de httpx acota cada lectura, no la duración total de la descarga.
+        """
+        template = route_template(path)
+        breaker = self._breaker(template)
+        remaining_budget(self.timeout)
+        # La descarga ocupa una conexión hasta el final: el turno se conserva mientras dura
+        async with self.scheduler.slot(current_user_id()):
+            timeout = remaining_budget(self.timeout)
+            capped = timeout < self.timeout
+            breaker.before_request()
+            status = "error"
+            self.in_flight += 1
+            started = perf_counter()
+            try:
+                try:
+                    # El span cubre hasta las cabeceras; el cuerpo se lee después, elemento a elemento
+                    with stage("backend", {"http.method": method, "http.route": template, "stream": True}) as span:
+                        request = self.client.build_request(method, path, params=params, timeout=timeout)
+                        response = await self.client.send(request, stream=True)
+                        span.set("http.status_code", str(response.status_code))
+                except httpx.TimeoutException as e:
+                    if not capped:
+                        breaker.record_failure()
+                        raise
+                    breaker.release()
+                    raise BudgetExhausted(f"Sin respuesta del backend en {timeout:.3f}s ({method} {template})") from e
+                except httpx.TransportError:
+                    breaker.record_failure()
+                    raise
+                except BaseException:
+                    breaker.release()
+                    raise
+                status = str(response.status_code)
+                if response.status_code < 500:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                try:
+                    yield response
+                finally:
+                    await response.aclose()
+            finally:
+                self.in_flight -= 1
+                backend_requests.inc(method, template, status)
+                backend_duration.observe(perf_counter() - started, method, template)
+
+    def _breaker(self, template: str) -> CircuitBreaker:
+        group = template.split("/")[1]
+        breaker = self.breakers.get(group)
+        if breaker is None:
+            breaker = self.breakers[group] = CircuitBreaker(group)
+        return breaker
+
+    async def _backoff(self, attempt: int) -> bool:
+        """Esperar con full jitter antes de reintentar; False si no cabe en el plazo"""
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() <= delay:
+            return False
+        await asyncio.sleep(delay)
+        self.retries += 1
+        return True
+
+    async def _send(self, route: tuple, method: str, path: str, params, json, headers=None) -> httpx.Response:
+        # El turno del usuario se espera antes de calcular el timeout: la cola consume plazo
+        async with self.scheduler.slot(current_user_id()):
+            timeout = remaining_budget(self.timeout)
+            # Timeout recortado por el plazo de quien llama: agotarlo no es culpa del backend
+            capped = timeout < self.timeout
+            status = "error"
+            self.in_flight += 1
+            started = perf_counter()
+            span = stage("backend", {"http.method": method, "http.route": route[1]})
+            try:
+                with span:
+                    # wait_for acota el total; el timeout de httpx solo acota cada fase por separado
+                    response = await asyncio.wait_for(
+                        self.client.request(method, path, params=params, json=json, headers=headers, timeout=timeout),
+                        timeout,
+                    )
+                    status = str(response.status_code)
+            except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+                status = "timeout"
+                error = BudgetExhausted if capped else DeadlineExceeded
+                raise error(f"Sin respuesta del backend en {timeout:.3f}s ({' '.join(route)})") from e
+            except asyncio.CancelledError:
+                status = "cancelled"
+                raise
+            finally:
+                span.set("http.status_code", status)
+                elapsed = perf_counter() - started
+                self.in_flight -= 1
+                backend_requests.inc(method, route[1], status)
+                backend_duration.observe(elapsed, *route)
+        self.latencies.record(route, elapsed)
+        return response
+
+    async def _hedged(self, route: tuple, method: str, path: str, params, json, headers=None) -> httpx.Response:
+        delay = self.latencies.percentile(route)
+        if delay is None:
+            return await self._send(route, method, path, params, json, headers)
+
+        first = asyncio.create_task(self._send(route, method, path, params, json, headers))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=max(delay, HEDGE_MIN_DELAY))
+            if not done:
+                self.hedges_sent += 1
+                tasks.add(asyncio.create_task(self._send(route, method, path, params, json, headers)))
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedges_won += 1
+                        return task.result()
+            # Todas fallaron: se propaga el error de la petición original
+            return first.result()
+        finally:
+            # También si la invocación se cancela: no dejar peticiones huérfanas
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def conditional_get(self, path: str, *, params: dict = None, decode, generation: int = None) -> tuple:
+        """
+        GET con revalidación: devuelve `(valor decodificado, bytes del cuerpo)`
+
+        Si hay una respuesta anterior del mismo recurso con ETag o Last-Modified
+        se envía If-None-Match / If-Modified-Since; ante un 304 se reutiliza el
+        valor ya decodificado sin descargar ni decodificar el cuerpo. Los errores
+        HTTP se lanzan como en `response.raise_for_status()`.
+        `generation` es la generación de escrituras del recurso capturada antes
+        de la petición: solo se revalidan respuestas pedidas con la misma.
+        """
+        key = resource_key(path, params)
+        stored = self.validators.get(key, generation)
+        headers = stored.conditional_headers() if stored is not None else None
+        response = await self.request("GET", path, params=params, headers=headers)
+        if response.status_code == 304 and stored is not None:
+            self.validators.not_modified += 1
+            self.validators.bytes_saved += stored.size
+            return stored.value, stored.size
+        response.raise_for_status()
+        if stored is not None:
+            self.validators.modified += 1
+        value = decode(response)
+        size = len(response.content)
+        self.validators.store(key, response, value, size, generation)
+        return value, size
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", path, **kwargs)
+
+    def reset(self):
+        """Descartar el pool heredado de otro proceso (fork); el nuevo se crea en el primer uso"""
+        self._client = None
+        self._loop = None
+        self.in_flight = 0
+        self.scheduler.reset()
+        self.validators.clear()
+
+    async def aclose(self):
+        """Cerrar el pool de conexiones"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def get_stats(self) -> dict:
+        return {
+            "pool_size": self.pool_size,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "retries": self.retries,
+            "circuits": {name: breaker.get_stats() for name, breaker in self.breakers.items()},
+            "scheduler": self.scheduler.get_stats(),
+            "conditional_get": self.validators.get_stats(),
+        }
+
+# Instancia global compartida por todas las herramientas
+backend = BackendClient()
+
+registry.gauge("backend_requests_in_flight", "Peticiones al backend en curso", function=lambda: backend.in_flight)
+registry.gauge("backend_pool_size", "Conexiones máximas del pool", function=lambda: backend.pool_size)
+registry.gauge("backend_pool_utilization", "Fracción del pool ocupada por peticiones en curso",
+               function=lambda: backend.in_flight / backend.pool_size)
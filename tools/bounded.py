@@ -0,0 +1,64 @@
+"""Estado por usuario con tamaño acotado: mapas LRU y contadores de escrituras"""
+from collections import OrderedDict
+from config import USER_STATE_MAX_ENTRIES
+
+class LRUDict(OrderedDict):
+    """
+    Diccionario que expulsa la clave usada hace más tiempo al superar `max_entries`
+
+    Las claves vienen de X-User-Id / user_id, que elige el cliente: sin límite
+    cada usuario nuevo ocuparía memoria mientras viva el proceso. `get` y la
+    asignación cuentan como uso.
+    """
+
+    def __init__(self, max_entries: int = USER_STATE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_entries:
+            self.popitem(last=False)
+            self.evictions += 1
+
+class WriteGenerations:
+    """
+    Contador de escrituras por clave para detectar escrituras durante una lectura
+
+    Quien lee captura `get(clave)` antes de pedir al backend y compara al
+    terminar. Los valores salen de un único contador creciente y una clave
+    expulsada por LRU devuelve el mayor valor expulsado: así una expulsión
+    nunca hace parecer que no hubo escrituras (como mucho fuerza una
+    resincronización de más).
+    """
+
+    def __init__(self, max_entries: int = USER_STATE_MAX_ENTRIES):
+        self._values = LRUDict(max_entries)
+        self._last = 0
+        self._floor = 0
+
+    def get(self, key) -> int:
+        return self._values.get(key, self._floor)
+
+    def bump(self, key) -> int:
+        self._last += 1
+        if key not in self._values and len(self._values) >= self._values.max_entries:
+            # La clave que va a salir deja su valor como suelo de las ausentes
+            self._floor = max(self._floor, next(iter(self._values.values())))
+        self._values[key] = self._last
+        return self._last
+
+    def clear(self):
+        self._values.clear()
+        self._floor = self._last
+
+    def __len__(self):
+        return len(self._values)
@@ -0,0 +1,47 @@
+"""Ejecución concurrente y acotada de escrituras en bloque (herramientas *_bulk)"""
+import asyncio
+from config import BULK_MAX_CONCURRENCY, BULK_MAX_ITEMS
+
+async def run_bulk(items: list, operation, name: str, concurrency: int = BULK_MAX_CONCURRENCY,
+                   max_items: int = BULK_MAX_ITEMS) -> dict:
+    """
+    Aplicar `operation(item)` a cada elemento con como mucho `concurrency` en curso
+
+    Cada elemento tiene su propio resultado en el orden de entrada; el fallo
+    de uno (respuesta con "error" o excepción) no detiene al resto. Las
+    tareas heredan el contexto de la invocación: mismo plazo y mismo usuario.
+    """
+    if not isinstance(items, list) or not items:
+        return {"error": f"'{name}' debe ser una lista no vacía"}
+    if len(items) > max_items:
+        return {"error": f"'{name}' supera el máximo de {max_items} elementos"}
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def execute(index: int, item) -> dict:
+        async with semaphore:
+            try:
+                result = await operation(item)
+            except Exception as e:
+                return {"index": index, "status": "error", "error": str(e)}
+        if isinstance(result, dict) and "error" in result:
+            return {"index": index, "status": "error", "error": result["error"]}
+        return {"index": index, "status": "ok", "result": result}
+
+    results = await asyncio.gather(*(execute(index, item) for index, item in enumerate(items)))
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    return {
+        "results": results,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+    }
+
+def require_object(item, *required: str) -> dict:
+    """Validar que el elemento es un objeto con los campos obligatorios"""
+    if not isinstance(item, dict):
+        raise ValueError("Cada elemento debe ser un objeto")
+    missing = [field for field in required if not item.get(field)]
+    if missing:
+        raise ValueError(f"Faltan campos obligatorios: {', '.join(missing)}")
+    return item
@@ -0,0 +1,120 @@
+"""Caché en memoria de lecturas del backend con TTL, LRU e invalidación por escritura"""
+from collections import OrderedDict
+from time import monotonic
+from config import CACHE_ENABLED, CACHE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES
+from tools.bounded import WriteGenerations
+
+# Centinela para distinguir un fallo de caché de un valor None
+MISS = object()
+
+def cache_key(namespace: str, params: dict) -> tuple:
+    """Clave (namespace, usuario, filtros) a partir de los parámetros de la petición"""
+    filters = tuple(sorted((k, v) for k, v in params.items() if k != "user_id"))
+    return (namespace, params.get("user_id"), filters)
+
+class ResponseCache:
+    """
+    Caché read-through de respuestas de listados
+
+    Las entradas expiran tras `ttl` segundos y se expulsan por LRU cuando se
+    supera `max_entries` o `max_bytes` (tamaño del cuerpo recibido del backend).
+    Los valores se comparten entre llamadas y no deben mutarse.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES, enabled: bool = CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._groups = {}               # (namespace, user) -> set de claves
+        self._generations = WriteGenerations()  # (namespace, user) -> contador de escrituras (LRU)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple):
+        """Devolver el valor cacheado o MISS"""
+        if not self.enabled:
+            return MISS
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISS
+        if entry[0] <= monotonic():
+            self._remove(key)
+            self.misses += 1
+            return MISS
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def generation(self, namespace: str, user_id: str) -> int:
+        """Contador de escrituras del grupo; se captura antes de pedir al backend"""
+        return self._generations.get((namespace, user_id))
+
+    def set(self, key: tuple, value, size: int, generation: int = None):
+        """
+        Guardar un valor
+
+        Si se pasa `generation` y hubo una escritura del mismo grupo mientras
+        la lectura estaba en curso, el valor ya puede estar obsoleto y no se guarda.
+        """
+        if not self.enabled or size > self.max_bytes:
+            return
+        group = key[:2]
+        if generation is not None and self._generations.get(group) != generation:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (monotonic() + self.ttl, size, value)
+        self._groups.setdefault(group, set()).add(key)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, namespace: str, user_id: str):
+        """Descartar todas las entradas de un grupo tras una escritura"""
+        group = (namespace, user_id)
+        self._generations.bump(group)
+        for key in self._groups.pop(group, ()):
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._groups.clear()
+        self._bytes = 0
+
+    def _remove(self, key: tuple):
+        expires_at, size, value = self._entries.pop(key)
+        self._bytes -= size
+        group = self._groups.get(key[:2])
+        if group is not None:
+            group.discard(key)
+            if not group:
+                del self._groups[key[:2]]
+
+    def get_stats(self) -> dict:
+        """Estadísticas de aciertos y ocupación"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+# Instancia global compartida por las herramientas de tareas y citas
+response_cache = ResponseCache()
@@ -0,0 +1,81 @@
+"""Circuit breaker por grupo de rutas del backend (tasks, appointments)"""
+from time import monotonic
+import httpx
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, CIRCUIT_HALF_OPEN_PROBES
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(httpx.HTTPError):
+    """El circuito está abierto: se falla sin contactar al backend"""
+
+class CircuitBreaker:
+    """
+    Abre el circuito tras `failure_threshold` fallos consecutivos
+
+    Mientras está abierto las peticiones fallan de inmediato. Pasado
+    `reset_timeout` deja pasar hasta `half_open_probes` peticiones de prueba:
+    si una tiene éxito el circuito se cierra y si falla vuelve a abrirse.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT, half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_request(self):
+        """Admitir la petición o lanzar CircuitOpenError"""
+        if self.state == CLOSED:
+            return
+        if self.state == OPEN:
+            if monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuito '{self.name}' abierto: backend no disponible")
+            self.state = HALF_OPEN
+            self.probes_in_flight = 0
+        if self.probes_in_flight >= self.half_open_probes:
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuito '{self.name}' en prueba: backend no disponible")
+        self.probes_in_flight += 1
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            self._open()
+            return
+        self.failures += 1
+        if self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """Liberar una prueba cancelada sin resultado (p.ej. la invocación se canceló)"""
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = monotonic()
+        self.times_opened += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,58 @@
+"""Herramientas MCP que combinan datos de tareas y citas"""
+import asyncio
+from datetime import datetime, timezone
+from config import AGENT_TIMEOUT
+from tools.deadline import current_deadline
+from tools.task_tools import task_tools
+from tools.appointment_tools import appointment_tools
+from tools.projection import parse_fields, InvalidFields
+
+class DataTool:
+    """Consultas agregadas sobre tareas y citas"""
+
+    @staticmethod
+    async def get_all_data(fields=None, compact: bool = False) -> dict:
+        """
+        Obtener tareas y citas en paralelo bajo un único plazo
+
+        Cada sección indica su estado en "status" ("ok", "error" o "timeout"):
+        una sección lenta no bloquea la otra, que se devuelve igualmente.
+        `fields` y `compact` se aplican a ambas secciones como en los listados.
+        """
+        try:
+            fields = parse_fields(fields)
+        except InvalidFields as e:
+            return {"error": str(e)}
+        fetches = {
+            "tasks": asyncio.create_task(task_tools.list_tasks(fields=fields, compact=compact)),
+            "appointments": asyncio.create_task(
+                appointment_tools.list_appointments(fields=fields, compact=compact)
+            ),
+        }
+        deadline = current_deadline()
+        timeout = AGENT_TIMEOUT if deadline is None else max(0, min(AGENT_TIMEOUT, deadline.remaining()))
+        done, pending = await asyncio.wait(fetches.values(), timeout=timeout)
+        for fetch in pending:
+            fetch.cancel()
+
+        result = {}
+        status = {}
+        for section, fetch in fetches.items():
+            if fetch in pending:
+                status[section] = "timeout"
+                result[section] = {"error": f"Tiempo agotado tras {timeout:.2f}s"}
+            elif fetch.exception() is not None:
+                status[section] = "error"
+                result[section] = {"error": f"Error al obtener datos: {str(fetch.exception())}"}
+            else:
+                data = fetch.result()
+                status[section] = "error" if "error" in data else "ok"
+                result[section] = data
+
+        result["status"] = status
+        result["complete"] = all(value == "ok" for value in status.values())
+        result["timestamp"] = datetime.now(timezone.utc).isoformat()
+        return result
+
+# Instancia global de herramientas agregadas
+data_tools = DataTool()
@@ -0,0 +1,67 @@
+"""Plazo por invocación de herramienta propagado a las peticiones al backend"""
+import contextvars
+from contextlib import contextmanager
+from time import monotonic
+import httpx
+from config import AGENT_TIMEOUT
+
+_current_deadline = contextvars.ContextVar("tool_deadline", default=None)
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """El presupuesto de la invocación se agotó antes de completar la petición"""
+
+class BudgetExhausted(DeadlineExceeded):
+    """
+    Se agotó el plazo de quien llama (en cola o antes de enviar), no el del backend
+
+    No cuenta como fallo del backend para el circuit breaker: un usuario que
+    agota su plazo en su propia cola no debe abrir el circuito de los demás.
+    """
+
+class Deadline:
+    """Instante límite absoluto (reloj monotónico) de una invocación"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = monotonic() + budget
+
+    def remaining(self) -> float:
+        return self.expires_at - monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+@contextmanager
+def deadline_scope(budget: float = AGENT_TIMEOUT):
+    """
+    Establecer el plazo de la invocación actual
+
+    Si ya existe un plazo más estricto (p.ej. una llamada anidada) se conserva.
+    Las tareas creadas dentro del bloque heredan el plazo vía contextvars.
+    """
+    outer = _current_deadline.get()
+    deadline = Deadline(budget)
+    if outer is not None and outer.expires_at <= deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def current_deadline():
+    """Plazo de la invocación en curso o None fuera de una invocación"""
+    return _current_deadline.get()
+
+def remaining_budget(default: float) -> float:
+    """
+    Tiempo disponible para la siguiente operación: el menor entre `default`
+    y lo que queda del plazo. Lanza DeadlineExceeded si ya no queda nada.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise BudgetExhausted(f"Plazo de {deadline.budget}s agotado")
+    return min(default, remaining)
@@ -0,0 +1,237 @@
+"""Planificador equitativo de peticiones al backend entre usuarios (tenants)"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from time import monotonic
+from config import BACKEND_POOL_SIZE, TENANT_MAX_CONCURRENCY, TENANT_RATE_LIMIT, TENANT_RATE_BURST, USER_STATE_MAX_ENTRIES
+from tools.bounded import LRUDict
+from tools.deadline import remaining_budget, BudgetExhausted
+from tools.metrics import backend_queue_delay
+from tools.tracing import stage
+
+class _Tenant:
+    """Cola, cuota y token bucket de un usuario; se olvida al quedar inactivo"""
+
+    __slots__ = ("waiters", "active", "tokens", "refilled_at", "queued", "stats")
+
+    def __init__(self, burst: float, stats: "_TenantStats"):
+        self.waiters = deque()
+        self.active = 0
+        self.tokens = burst
+        self.refilled_at = monotonic()
+        self.queued = 0
+        self.stats = stats
+
+class _TenantStats:
+    """Peticiones y espera en cola acumuladas de un usuario; sobreviven a su _Tenant"""
+
+    __slots__ = ("requests", "total_wait", "max_wait", "rate_limited")
+
+    def __init__(self):
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.rate_limited = 0
+
+class FairScheduler:
+    """
+    Reparte `capacity` huecos de ejecución entre usuarios por turnos (round-robin)
+
+    Cada usuario tiene una cuota de peticiones simultáneas y, opcionalmente,
+    un límite de peticiones por segundo (token bucket con ráfaga `burst`).
+    Cuando hay espera, los huecos libres se conceden por turnos entre los
+    usuarios con peticiones en cola, así un usuario ruidoso no acapara el pool
+    aunque encole cientos de peticiones. La espera en cola respeta el plazo de
+    la invocación (tools.deadline).
+    """
+
+    def __init__(self, capacity: int = BACKEND_POOL_SIZE, tenant_concurrency: int = TENANT_MAX_CONCURRENCY,
+                 rate: float = TENANT_RATE_LIMIT, burst: float = TENANT_RATE_BURST):
+        self.capacity = capacity
+        self.tenant_concurrency = tenant_concurrency
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.in_use = 0
+        self._tenants = {}
+        self._stats = LRUDict(USER_STATE_MAX_ENTRIES)  # usuario -> _TenantStats (LRU)
+        self._ring = deque()  # usuarios con peticiones en cola, en orden de turno
+        self._timer = None
+        self._prune_at = 64
+        self.forgotten = 0
+
+    def _tenant(self, tenant_id: str) -> _Tenant:
+        tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            if len(self._tenants) >= self._prune_at:
+                # Purga amortizada de los inactivos que esperaban a rellenar su bucket
+                for idle_id, idle in list(self._tenants.items()):
+                    self._forget_idle(idle_id, idle)
+                self._prune_at = max(64, 2 * len(self._tenants))
+            stats = self._stats.get(tenant_id)
+            if stats is None:
+                stats = self._stats[tenant_id] = _TenantStats()
+            tenant = self._tenants[tenant_id] = _Tenant(self.burst, stats)
+        return tenant
+
+    def _refill(self, tenant: _Tenant, now: float):
+        if self.rate > 0:
+            tenant.tokens = min(self.burst, tenant.tokens + (now - tenant.refilled_at) * self.rate)
+            tenant.refilled_at = now
+
+    def _eligible(self, tenant: _Tenant, now: float) -> bool:
+        if tenant.active >= self.tenant_concurrency:
+            return False
+        if self.rate > 0:
+            self._refill(tenant, now)
+            return tenant.tokens >= 1
+        return True
+
+    def _grant(self, tenant: _Tenant):
+        self.in_use += 1
+        tenant.active += 1
+        if self.rate > 0:
+            tenant.tokens -= 1
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str):
+        """Ocupar un hueco para `tenant_id`, esperando su turno si hace falta"""
+        tenant = self._tenant(tenant_id)
+        tenant.stats.requests += 1
+        now = monotonic()
+        if not tenant.waiters and self.in_use < self.capacity and self._eligible(tenant, now):
+            self._grant(tenant)
+        else:
+            with stage("queue", {"queue": "tenant"}):
+                await self._wait(tenant_id, tenant, now)
+        backend_queue_delay.observe(monotonic() - now)
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+            tenant.active -= 1
+            self._dispatch()
+            self._forget_idle(tenant_id, tenant)
+
+    async def _wait(self, tenant_id: str, tenant: _Tenant, queued_at: float):
+        if self.rate > 0 and tenant.tokens < 1:
+            tenant.stats.rate_limited += 1
+        future = asyncio.get_running_loop().create_future()
+        tenant.waiters.append(future)
+        tenant.queued += 1
+        if len(tenant.waiters) == 1:
+            self._ring.append(tenant_id)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), remaining_budget(float("inf")))
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # El hueco llegó a concederse: devolverlo para el siguiente en cola
+                self.in_use -= 1
+                tenant.active -= 1
+                self._dispatch()
+            else:
+                future.cancel()
+                self._discard(tenant_id, tenant, future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise BudgetExhausted(f"Plazo agotado en la cola del usuario '{tenant_id}'") from None
+            raise
+        finally:
+            tenant.queued -= 1
+            wait = monotonic() - queued_at
+            tenant.stats.total_wait += wait
+            tenant.stats.max_wait = max(tenant.stats.max_wait, wait)
+            # Si la espera terminó en error el usuario puede haber quedado inactivo
+            self._forget_idle(tenant_id, tenant)
+
+    def _discard(self, tenant_id: str, tenant: _Tenant, future):
+        try:
+            tenant.waiters.remove(future)
+        except ValueError:
+            return
+        if not tenant.waiters:
+            try:
+                self._ring.remove(tenant_id)
+            except ValueError:
+                pass
+
+    def _forget_idle(self, tenant_id: str, tenant: _Tenant):
+        """
+        Olvidar a un usuario sin peticiones en curso ni en cola
+
+        Con límite de tasa se conserva hasta que su token bucket vuelva a estar
+        lleno: olvidarlo antes le regalaría una ráfaga nueva. Esos usuarios se
+        purgan al dar de alta otros (_tenant).
+        """
+        if tenant.active or tenant.waiters or self._tenants.get(tenant_id) is not tenant:
+            return
+        if self.rate > 0:
+            self._refill(tenant, monotonic())
+            if tenant.tokens < self.burst:
+                return
+        del self._tenants[tenant_id]
+        self.forgotten += 1
+
+    def _dispatch(self):
+        """Conceder huecos libres por turnos a los usuarios con cola"""
+        now = monotonic()
+        skipped = 0
+        while self._ring and self.in_use < self.capacity and skipped < len(self._ring):
+            tenant_id = self._ring[0]
+            tenant = self._tenants[tenant_id]
+            self._ring.rotate(-1)
+            if not self._eligible(tenant, now):
+                skipped += 1
+                continue
+            skipped = 0
+            future = tenant.waiters.popleft()
+            if not tenant.waiters:
+                self._ring.remove(tenant_id)
+            self._grant(tenant)
+            future.set_result(None)
+        if self._ring and self.in_use < self.capacity and self.rate > 0:
+            self._schedule_refill()
+
+    def _schedule_refill(self):
+        """Volver a repartir cuando el primer usuario limitado por tasa tenga un token"""
+        if self._timer is not None:
+            return
+        delay = min((1 - self._tenants[tenant_id].tokens) / self.rate for tenant_id in self._ring)
+        loop = asyncio.get_running_loop()
+
+        def wake():
+            self._timer = None
+            self._dispatch()
+
+        self._timer = loop.call_later(max(delay, 0.001), wake)
+
+    def reset(self):
+        """Olvidar colas y huecos de otro proceso (fork): sus tareas no existen aquí"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self.in_use = 0
+        self._tenants = {}
+        self._stats = LRUDict(USER_STATE_MAX_ENTRIES)
+        self._ring = deque()
+        self._timer = None
+
+    def _tenant_stats(self, tenant_id: str, stats: _TenantStats) -> dict:
+        tenant = self._tenants.get(tenant_id)
+        return {
+            "requests": stats.requests,
+            "active": tenant.active if tenant is not None else 0,
+            "queued": tenant.queued if tenant is not None else 0,
+            "rate_limited": stats.rate_limited,
+            "avg_queue_ms": round(stats.total_wait / stats.requests * 1000, 2) if stats.requests else 0.0,
+            "max_queue_ms": round(stats.max_wait * 1000, 2),
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "tenant_concurrency": self.tenant_concurrency,
+            "tenant_rate_limit": self.rate,
+            "forgotten_tenants": self.forgotten,
+            # Estadísticas de los USER_STATE_MAX_ENTRIES usuarios más recientes, activos o no
+            "tenants": {tenant_id: self._tenant_stats(tenant_id, stats) for tenant_id, stats in self._stats.items()},
+        }
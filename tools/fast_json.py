@@ -0,0 +1,100 @@
+"""Codificación JSON rápida (orjson si está instalado) y reenvío del cuerpo original del backend"""
+import json
+from config import JSON_PASSTHROUGH
+from tools.tracing import stage
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa la librería estándar
+    orjson = None
+
+# Opciones de orjson equivalentes a json.dumps(..., ensure_ascii=False, default=str)
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+def dumps(value) -> bytes:
+    """Serializar a JSON compacto en UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=_ORJSON_OPTIONS)
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":")).encode()
+
+def loads(body):
+    """Decodificar JSON desde bytes o texto"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+class RawJSON(dict):
+    """
+    Objeto decodificado que conserva los bytes exactos de los que procede
+
+    Se comporta como un dict normal para cachés, resúmenes y paginación. Mientras
+    no se modifique, `raw` se puede enviar tal cual al cliente sin volver a
+    codificar; cualquier modificación lo descarta.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, data: dict, raw: bytes):
+        super().__init__(data)
+        self.raw = raw
+
+    def _modified(self):
+        self.raw = None
+
+    def __setitem__(self, key, value):
+        self._modified()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._modified()
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        self._modified()
+        return super().__ior__(other)
+
+    def update(self, *args, **kwargs):
+        self._modified()
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._modified()
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self._modified()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._modified()
+        return super().popitem()
+
+    def clear(self):
+        self._modified()
+        super().clear()
+
+    def copy(self) -> "RawJSON":
+        return RawJSON(self, self.raw)
+
+    def __reduce__(self):
+        # Al copiar o serializar con pickle se conserva como dict normal
+        return dict, (dict(self),)
+
+def decode_response(response):
+    """
+    Decodificar el cuerpo JSON de una respuesta httpx
+
+    Con JSON_PASSTHROUGH los objetos se devuelven como RawJSON para que el
+    wrapper HTTP pueda reenviar el cuerpo original si nadie lo ha modificado.
+    """
+    body = response.content
+    with stage("decode", {"bytes": len(body)}):
+        data = loads(body)
+    if JSON_PASSTHROUGH and isinstance(data, dict):
+        return RawJSON(data, body)
+    return data
+
+def raw_body(value):
+    """Bytes originales del backend si `value` no se ha modificado, o None"""
+    return value.raw if isinstance(value, RawJSON) else None
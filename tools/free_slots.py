@@ -0,0 +1,98 @@
+"""Búsqueda de huecos libres: barrido de tramos ocupados contra el horario laboral"""
+from datetime import datetime, time, timedelta
+from tools.recurrence import WEEKDAYS
+
+class WorkingHoursError(ValueError):
+    """Horario laboral con formato no admitido"""
+
+def _clock(value: str) -> time:
+    try:
+        hours, minutes = value.split(":")
+        if hours == "24" and minutes == "00":
+            return time.max
+        return time(int(hours), int(minutes))
+    except ValueError:
+        raise WorkingHoursError(f"Hora inválida: '{value}' (formato HH:MM)") from None
+
+def parse_working_hours(value: str) -> tuple:
+    """
+    Interpretar un horario como "09:00-18:00" o "MO-FR 09:00-18:00"
+
+    Los días admiten rangos (MO-FR) y listas (MO,WE,FR); sin días se
+    aplica todos los días. Devuelve (días de la semana, apertura, cierre).
+    """
+    if not isinstance(value, str) or not value.strip():
+        raise WorkingHoursError("working_hours debe ser un texto como 'MO-FR 09:00-18:00'")
+    days_part, _, hours_part = value.strip().upper().rpartition(" ")
+    weekdays = set()
+    for item in filter(None, days_part.replace(" ", "").split(",")):
+        first, _, last = item.partition("-")
+        if first not in WEEKDAYS or (last and last not in WEEKDAYS):
+            raise WorkingHoursError(f"Días inválidos: '{item}' (admite {', '.join(WEEKDAYS)} y rangos como MO-FR)")
+        low, high = WEEKDAYS.index(first), WEEKDAYS.index(last or first)
+        if high < low:
+            raise WorkingHoursError(f"Rango de días invertido: '{item}'")
+        weekdays.update(range(low, high + 1))
+    opening, separator, closing = hours_part.partition("-")
+    if not separator:
+        raise WorkingHoursError("Falta el horario: 'HH:MM-HH:MM'")
+    opening, closing = _clock(opening), _clock(closing)
+    if closing <= opening:
+        raise WorkingHoursError("El cierre debe ser posterior a la apertura (sin turnos de noche)")
+    return frozenset(weekdays or range(7)), opening, closing
+
+def working_windows(range_start: datetime, range_end: datetime, hours: tuple = None):
+    """
+    Ventanas (inicio, fin) en segundos epoch del horario laboral dentro del rango
+
+    Las horas se interpretan en la zona de `range_start`. Sin horario, el
+    rango completo es una única ventana.
+    """
+    start, end = range_start.timestamp(), range_end.timestamp()
+    if hours is None:
+        yield start, end
+        return
+    weekdays, opening, closing = hours
+    zone = range_start.tzinfo
+    day = range_start.date()
+    while day <= range_end.date():
+        if day.weekday() in weekdays:
+            window_start = datetime.combine(day, opening, zone).timestamp()
+            window_end = datetime.combine(day, closing, zone).timestamp()
+            if closing == time.max:
+                window_end = datetime.combine(day + timedelta(days=1), time(), zone).timestamp()
+            window_start, window_end = max(window_start, start), min(window_end, end)
+            if window_start < window_end:
+                yield window_start, window_end
+        day += timedelta(days=1)
+
+def sweep_free(busy: list, windows, duration: float, limit: int) -> list:
+    """
+    Huecos (inicio, fin) de al menos `duration` segundos, en orden, hasta `limit`
+
+    `busy` son tramos ordenados y sin solape (IntervalIndex.busy). Un único
+    barrido con dos punteros recorre ventanas y tramos a la vez: O(v + k).
+    """
+    gaps = []
+    position, count = 0, len(busy)
+    for window_start, window_end in windows:
+        cursor = window_start
+        # Tramos que terminan antes de la ventana ya no afectan a ninguna otra
+        while position < count and busy[position][1] <= cursor:
+            position += 1
+        while position < count and busy[position][0] < window_end:
+            busy_start, busy_end = busy[position]
+            if busy_start - cursor >= duration:
+                gaps.append((cursor, busy_start))
+                if len(gaps) >= limit:
+                    return gaps
+            cursor = max(cursor, busy_end)
+            if cursor >= window_end:
+                # El tramo sigue en la siguiente ventana: no se descarta todavía
+                break
+            position += 1
+        if window_end - cursor >= duration:
+            gaps.append((cursor, window_end))
+            if len(gaps) >= limit:
+                return gaps
+    return gaps
@@ -0,0 +1,230 @@
+"""Índice de intervalos en memoria para responder disponibilidad sin ir al backend"""
+from bisect import bisect_left
+from itertools import accumulate
+from time import monotonic
+from config import AVAILABILITY_LOCAL, AVAILABILITY_RESYNC_INTERVAL
+from tools.timeutils import to_timestamp
+from tools.bounded import LRUDict, WriteGenerations
+
+try:
+    import numpy
+except ImportError:  # numpy es opcional: sin él las comparaciones se hacen con bisect
+    numpy = None
+
+# Estados que no ocupan la agenda
+_FREE_STATUSES = {"cancelled"}
+
+class IntervalIndex:
+    """
+    Citas activas de un usuario ordenadas por inicio
+
+    Las consultas de solape buscan por bisección los inicios en
+    [inicio - duración_máxima, fin) y filtran por fin: O(log n + k).
+    """
+
+    def __init__(self):
+        self._entries = []   # (inicio, fin, id) ordenado
+        self._starts = []    # inicios en el mismo orden, para bisect
+        self._by_id = {}     # id -> (entrada, cita)
+        self._max_duration = 0.0
+        self.synced_at = 0.0
+        self.dirty = False
+
+    def load(self, appointments: list):
+        self.dirty = False
+        self._entries.clear()
+        self._starts.clear()
+        self._by_id.clear()
+        self._max_duration = 0.0
+        entries = []
+        for appointment in appointments:
+            entry = self._entry(appointment)
+            if entry is not None:
+                entries.append(entry)
+                self._by_id[entry[2]] = (entry, appointment)
+                self._max_duration = max(self._max_duration, entry[1] - entry[0])
+        entries.sort()
+        self._entries.extend(entries)
+        self._starts.extend(entry[0] for entry in entries)
+        self.synced_at = monotonic()
+
+    def _entry(self, appointment: dict):
+        """Entrada (inicio, fin, id) o None si la cita no ocupa la agenda"""
+        if appointment.get("status") in _FREE_STATUSES or "id" not in appointment:
+            return None
+        try:
+            return (to_timestamp(appointment["start_time"]), to_timestamp(appointment["end_time"]), appointment["id"])
+        except (KeyError, TypeError, ValueError):
+            # Cita con fechas ilegibles: el índice ya no es fiable
+            self.dirty = True
+            return None
+
+    def remove(self, appointment_id) -> bool:
+        found = self._by_id.pop(appointment_id, None)
+        if found is None:
+            return False
+        entry = found[0]
+        position = bisect_left(self._entries, entry)
+        del self._entries[position]
+        del self._starts[position]
+        return True
+
+    def upsert(self, appointment_id, appointment: dict, expect_existing: bool):
+        previous = self._by_id.get(appointment_id)
+        if expect_existing and previous is None:
+            self.dirty = True
+        if previous is not None:
+            # Actualización parcial: completar con los datos conocidos
+            appointment = {**previous[1], **appointment}
+            self.remove(appointment_id)
+        appointment.setdefault("id", appointment_id)
+        entry = self._entry(appointment)
+        if entry is None:
+            return
+        position = bisect_left(self._entries, entry)
+        self._entries.insert(position, entry)
+        self._starts.insert(position, entry[0])
+        self._by_id[entry[2]] = (entry, appointment)
+        self._max_duration = max(self._max_duration, entry[1] - entry[0])
+
+    def overlapping(self, start: float, end: float) -> list:
+        """Citas que se solapan con [start, end)"""
+        low = bisect_left(self._starts, start - self._max_duration)
+        high = bisect_left(self._starts, end)
+        return [self._by_id[entry[2]][1] for entry in self._entries[low:high] if entry[1] > start]
+
+    def busy(self, start: float, end: float) -> list:
+        """
+        Tramos ocupados [inicio, fin) dentro de [start, end), fusionados y ordenados
+
+        Barrido sobre las citas ya ordenadas por inicio: cada una amplía el
+        tramo en curso o abre uno nuevo. O(log n + k) para k citas en el rango.
+        """
+        low = bisect_left(self._starts, start - self._max_duration)
+        high = bisect_left(self._starts, end)
+        merged = []
+        current_start = current_end = float("-inf")
+        for entry_start, entry_end, _ in self._entries[low:high]:
+            if entry_start <= current_end:
+                if entry_end > current_end:
+                    current_end = entry_end
+                continue
+            if current_end > start:
+                merged.append((current_start, current_end))
+            current_start, current_end = entry_start, entry_end
+        if current_end > start:
+            merged.append((current_start, current_end))
+        # Solo el primer y el último tramo pueden salirse del rango
+        if merged:
+            merged[0] = (max(merged[0][0], start), merged[0][1])
+            merged[-1] = (merged[-1][0], min(merged[-1][1], end))
+        return merged
+
+    def conflicts(self, starts: list, ends: list) -> list:
+        """
+        Posiciones de los intervalos [starts[i], ends[i]) que chocan con alguna cita
+
+        Una sola pasada para todos: con las citas ordenadas por inicio y el
+        máximo acumulado de sus fines, el intervalo i choca si entre las citas
+        que empiezan antes de ends[i] la que más tarde termina lo hace después
+        de starts[i]. Con numpy las comparaciones se hacen sobre arrays.
+        """
+        if not self._entries or not starts:
+            return []
+        if numpy is not None:
+            entry_starts = numpy.array(self._starts, dtype=float)
+            latest_end = numpy.maximum.accumulate(numpy.array([entry[1] for entry in self._entries], dtype=float))
+            high = numpy.searchsorted(entry_starts, numpy.asarray(ends, dtype=float), side="left")
+            hits = high > 0
+            hits[hits] = latest_end[high[hits] - 1] > numpy.asarray(starts, dtype=float)[hits]
+            return numpy.flatnonzero(hits).tolist()
+        latest_end = list(accumulate((entry[1] for entry in self._entries), max))
+        positions = []
+        for position, (start, end) in enumerate(zip(starts, ends)):
+            high = bisect_left(self._starts, end)
+            if high and latest_end[high - 1] > start:
+                positions.append(position)
+        return positions
+
+    def __len__(self):
+        return len(self._entries)
+
+class AvailabilityIndex:
+    """
+    Índices de intervalos por usuario, mantenidos con las escrituras de citas
+
+    Igual que el motor de resúmenes: se construyen desde el listado completo
+    y se resincronizan al pasar `resync_interval` o al detectar deriva.
+    """
+
+    def __init__(self, enabled: bool = AVAILABILITY_LOCAL, resync_interval: float = AVAILABILITY_RESYNC_INTERVAL):
+        self.enabled = enabled
+        self.resync_interval = resync_interval
+        self._indexes = LRUDict()
+        self._generations = WriteGenerations()
+        self.local_answers = 0
+        self.resyncs = 0
+
+    def _stale(self, index: IntervalIndex) -> bool:
+        return index.dirty or monotonic() - index.synced_at > self.resync_interval
+
+    async def get_index(self, user_id: str, fetch):
+        """Índice actualizado del usuario, o el dict de error de `fetch()`"""
+        index = self._indexes.get(user_id)
+        if index is None or self._stale(index):
+            generation = self._generations.get(user_id)
+            data = await fetch()
+            if "error" in data:
+                return data
+            index = self._indexes.get(user_id)
+            if index is None or self._stale(index):
+                index = self.load(user_id, data.get("appointments", []))
+            if self._generations.get(user_id) != generation:
+                index.dirty = True
+        return index
+
+    def load(self, user_id: str, appointments: list) -> IntervalIndex:
+        index = self._indexes.get(user_id)
+        if index is None:
+            index = self._indexes[user_id] = IntervalIndex()
+        index.load(appointments)
+        self.resyncs += 1
+        return index
+
+    def _index_for_write(self, user_id: str):
+        self._generations.bump(user_id)
+        return self._indexes.get(user_id)
+
+    def record_upsert(self, user_id: str, appointment_id, appointment, created: bool = False):
+        index = self._index_for_write(user_id)
+        if index is None:
+            return
+        appointment_id = appointment_id or (appointment.get("id") if isinstance(appointment, dict) else None)
+        if appointment_id is None or not isinstance(appointment, dict):
+            index.dirty = True
+            return
+        index.upsert(appointment_id, dict(appointment), expect_existing=not created)
+
+    def record_delete(self, user_id: str, appointment_id):
+        index = self._index_for_write(user_id)
+        if index is not None:
+            # Una cita cancelada ya no está en el índice: no es deriva
+            index.remove(appointment_id)
+
+    def mark_dirty(self, user_id: str):
+        index = self._index_for_write(user_id)
+        if index is not None:
+            index.dirty = True
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "indexes": len(self._indexes),
+            "evicted": self._indexes.evictions,
+            "intervals": sum(len(index) for index in self._indexes.values()),
+            "local_answers": self.local_answers,
+            "resyncs": self.resyncs,
+        }
+
+# Instancia global compartida por las herramientas de citas
+availability_index = AvailabilityIndex()
@@ -0,0 +1,108 @@
+"""Decodificación incremental de listados JSON recibidos por trozos"""
+import codecs
+import json
+
+_WHITESPACE = " \t\n\r"
+
+class JSONStreamError(ValueError):
+    """El cuerpo recibido no es el objeto JSON esperado"""
+
+class _Buffer:
+    """Texto pendiente de decodificar, alimentado desde un iterador asíncrono de bytes"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks.__aiter__()
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    async def fill(self) -> bool:
+        """Leer otro trozo; False si el cuerpo ya terminó"""
+        if self.eof:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self.eof = True
+            self.text = self.text[self.pos:] + self._decoder.decode(b"", final=True)
+            self.pos = 0
+            return False
+        # Descartar lo ya consumido para que el buffer no crezca con el listado
+        self.text = self.text[self.pos:] + self._decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    async def peek(self) -> str:
+        """Siguiente carácter significativo (sin consumirlo), o "" al final"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not await self.fill():
+                return ""
+
+    async def expect(self, char: str):
+        if await self.peek() != char:
+            raise JSONStreamError(f"Se esperaba '{char}' en el cuerpo JSON")
+        self.pos += 1
+
+    async def value(self):
+        """Decodificar el siguiente valor completo, leyendo más trozos si hace falta"""
+        await self.peek()
+        decoder = json.JSONDecoder()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as e:
+                if await self.fill():
+                    continue
+                raise JSONStreamError(f"JSON incompleto o inválido: {e}") from None
+            # Un número al final del buffer puede continuar en el siguiente trozo
+            if end == len(self.text) and not self.eof and isinstance(value, (int, float)):
+                if await self.fill():
+                    continue
+            self.pos = end
+            return value
+
+async def iter_items(chunks, key: str, extras: dict = None):
+    """
+    Producir los elementos de la lista `key` de un objeto JSON según se reciben
+
+    `chunks` es un iterador asíncrono de bytes (p.ej. `response.aiter_bytes()`).
+    El resto de claves de primer nivel se guardan en `extras` si se indica.
+    Solo se retiene en memoria el elemento en curso.
+    """
+    buffer = _Buffer(chunks)
+    await buffer.expect("{")
+    if await buffer.peek() == "}":
+        return
+    while True:
+        name = await buffer.value()
+        if not isinstance(name, str):
+            raise JSONStreamError("Clave de objeto JSON inválida")
+        await buffer.expect(":")
+        if name == key:
+            await buffer.expect("[")
+            if await buffer.peek() == "]":
+                buffer.pos += 1
+            else:
+                while True:
+                    yield await buffer.value()
+                    separator = await buffer.peek()
+                    buffer.pos += 1
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise JSONStreamError(f"Se esperaba ',' o ']' en la lista '{key}'")
+        else:
+            value = await buffer.value()
+            if extras is not None:
+                extras[name] = value
+        separator = await buffer.peek()
+        buffer.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise JSONStreamError("Se esperaba ',' o '}' en el cuerpo JSON")
@@ -0,0 +1,158 @@
+"""Métricas en proceso con exposición en formato de texto de Prometheus"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+# Límites de los histogramas de latencia (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    """Escapar un valor de etiqueta según el formato de texto de Prometheus"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def total(self) -> float:
+        """Suma de todas las series"""
+        return sum(self._values.values())
+
+    def render(self) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+                for labels, value in self._values.items()]
+
+class Gauge(Counter):
+    """Valor instantáneo con etiquetas; admite una función para calcularlo al exportar"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), function=None):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+
+    def dec(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, *labels, value: float):
+        self._values[labels] = value
+
+    def render(self) -> list:
+        if self.function is not None:
+            return [f"{self.name} {self.function()}"]
+        return super().render()
+
+class Histogram:
+    """Histograma acumulativo por etiquetas; observar cuesta un bisect y tres sumas"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # labels -> [conteos por bucket (+Inf al final), suma]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Conjunto de métricas exportadas en /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple = (), function=None) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames, function))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Registro global y métricas compartidas por las herramientas y los transportes
+registry = MetricsRegistry()
+
+tool_calls = registry.counter("mcp_tool_calls_total", "Llamadas a herramientas", ("tool", "transport"))
+tool_errors = registry.counter("mcp_tool_errors_total", "Llamadas a herramientas con error", ("tool", "transport"))
+tool_duration = registry.histogram("mcp_tool_duration_seconds", "Latencia de las herramientas", ("tool", "transport"))
+tool_in_flight = registry.gauge("mcp_tool_in_flight", "Llamadas a herramientas en curso", ("tool", "transport"))
+
+backend_requests = registry.counter("backend_requests_total", "Peticiones al backend por código de estado",
+                                    ("method", "route", "status"))
+backend_duration = registry.histogram("backend_request_duration_seconds", "Latencia de las peticiones al backend",
+                                      ("method", "route"))
+backend_queue_delay = registry.histogram("backend_queue_delay_seconds",
+                                         "Espera en la cola equitativa por usuario antes de contactar al backend")
+
+class _ToolCall:
+    """Resultado de una llamada medida; quien llama marca `error` si la herramienta devolvió un error"""
+
+    __slots__ = ("error",)
+
+    def __init__(self):
+        self.error = False
+
+@contextmanager
+def track_tool_call(tool: str, transport: str):
+    """Medir una llamada a herramienta (contador, errores, latencia y en curso)"""
+    call = _ToolCall()
+    tool_in_flight.inc(tool, transport)
+    started = perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.error = True
+        raise
+    finally:
+        tool_in_flight.dec(tool, transport)
+        tool_duration.observe(perf_counter() - started, tool, transport)
+        tool_calls.inc(tool, transport)
+        if call.error:
+            tool_errors.inc(tool, transport)
@@ -0,0 +1,54 @@
+"""Paginación por cursor sobre los listados del backend"""
+import base64
+import binascii
+import json
+from config import LIST_MAX_LIMIT
+
+class InvalidCursor(ValueError):
+    """Cursor ilegible o que no corresponde a este listado"""
+
+def encode_cursor(offset: int, last_id) -> str:
+    raw = json.dumps([offset, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        offset, last_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Cursor inválido")
+    if not isinstance(offset, int) or offset < 0:
+        raise InvalidCursor("Cursor inválido")
+    return offset, last_id
+
+def _resume_position(items: list, offset: int, last_id) -> int:
+    """Posición siguiente al último elemento entregado, aunque el listado haya cambiado"""
+    if last_id is None or (0 < offset <= len(items) and items[offset - 1].get("id") == last_id):
+        return offset
+    # Hubo altas o bajas antes del cursor: buscar el último elemento entregado
+    for position, item in enumerate(items):
+        if item.get("id") == last_id:
+            return position + 1
+    return min(offset, len(items))
+
+def paginate(data: dict, collection: str, limit: int = None, cursor: str = None) -> dict:
+    """
+    Recortar `data[collection]` a una página de `limit` elementos desde `cursor`
+
+    Sin `limit` ni `cursor` se devuelve `data` sin cambios. La respuesta
+    incluye `total` (elementos del listado completo) y `next_cursor`, que es
+    None en la última página. El cursor guarda la posición y el id del último
+    elemento entregado para no repetir ni saltar elementos si el listado cambia
+    entre páginas.
+    """
+    if limit is None and cursor is None:
+        return data
+    items = data.get(collection, [])
+    limit = LIST_MAX_LIMIT if limit is None else max(1, min(int(limit), LIST_MAX_LIMIT))
+    start = 0
+    if cursor:
+        start = _resume_position(items, *decode_cursor(cursor))
+    page = items[start:start + limit]
+    end = start + len(page)
+    next_cursor = encode_cursor(end, page[-1].get("id")) if page and end < len(items) else None
+    return {**data, collection: page, "total": len(items), "next_cursor": next_cursor}
@@ -0,0 +1,52 @@
+"""Proyección de campos y formato compacto (por columnas) de los listados"""
+
+class InvalidFields(ValueError):
+    """Parámetro `fields` con un formato no admitido"""
+
+def parse_fields(fields) -> tuple:
+    """
+    Normalizar `fields`: lista de nombres o texto separado por comas
+
+    Devuelve None si no se pidió proyección (se devuelven todos los campos).
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    if not isinstance(fields, (list, tuple)) or not all(isinstance(field, str) for field in fields):
+        raise InvalidFields("fields debe ser una lista de nombres de campo o un texto separado por comas")
+    names = tuple(dict.fromkeys(field.strip() for field in fields if field.strip()))
+    if not names:
+        raise InvalidFields("fields no incluye ningún campo")
+    return names
+
+def project_item(item, fields: tuple):
+    """Quedarse solo con `fields` (los ausentes en el registro se omiten)"""
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+def to_columns(items: list, fields: tuple = None) -> dict:
+    """
+    Convertir una lista de registros en `{campo: [valores]}`
+
+    Sin `fields` las columnas son la unión de claves en orden de aparición;
+    un registro sin alguna de ellas aporta None en esa posición.
+    """
+    if fields is None:
+        fields = tuple(dict.fromkeys(key for item in items for key in item))
+    return {field: [item.get(field) for item in items] for field in fields}
+
+def shape_listing(data: dict, collection: str, fields: tuple = None, compact: bool = False) -> dict:
+    """Aplicar proyección y formato compacto a una respuesta `{collection: [...], ...}`"""
+    if (fields is None and not compact) or "error" in data:
+        return data
+    items = data.get(collection, [])
+    if compact:
+        shaped = to_columns(items, fields)
+    else:
+        shaped = [project_item(item, fields) for item in items]
+    result = {**data, collection: shaped}
+    if compact:
+        result["format"] = "columns"
+    return result
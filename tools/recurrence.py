@@ -0,0 +1,154 @@
+"""Reglas de recurrencia (subconjunto de RRULE, RFC 5545) y generación perezosa de ocurrencias"""
+import calendar
+from datetime import datetime, timedelta
+from tools.timeutils import parse_iso
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+
+# Horizonte máximo de una serie: una regla que nunca coincide (p.ej. el 31 de
+# cada febrero) deja de buscar aquí en lugar de iterar para siempre
+MAX_YEARS = 20
+
+class RecurrenceError(ValueError):
+    """Regla de recurrencia con formato no admitido"""
+
+def _int(name: str, value: str, low: int, high: int) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise RecurrenceError(f"{name} debe ser un entero") from None
+    if not low <= number <= high:
+        raise RecurrenceError(f"{name} debe estar entre {low} y {high}")
+    return number
+
+def parse_rrule(rule: str) -> dict:
+    """
+    Interpretar una regla como "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10"
+
+    Admite FREQ (DAILY, WEEKLY, MONTHLY), INTERVAL, COUNT, UNTIL, BYDAY
+    (sin ordinales: MO, TU...) y BYMONTHDAY (negativos desde fin de mes).
+    Exige COUNT o UNTIL: una serie sin fin no se puede programar.
+    """
+    if not isinstance(rule, str) or not rule.strip():
+        raise RecurrenceError("rrule debe ser un texto como FREQ=DAILY;COUNT=5")
+    rule = rule.strip()
+    if rule.upper().startswith("RRULE:"):
+        rule = rule[6:]
+    parts = {}
+    for part in rule.split(";"):
+        if not part:
+            continue
+        name, separator, value = part.partition("=")
+        name = name.strip().upper()
+        if not separator or not value.strip():
+            raise RecurrenceError(f"Parte de rrule inválida: '{part}'")
+        if name in parts:
+            raise RecurrenceError(f"{name} aparece más de una vez")
+        parts[name] = value.strip().upper()
+
+    unknown = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY", "WKST"}
+    if unknown:
+        raise RecurrenceError(f"Partes de rrule no admitidas: {', '.join(sorted(unknown))}")
+    frequency = parts.get("FREQ")
+    if frequency not in FREQUENCIES:
+        raise RecurrenceError(f"FREQ debe ser uno de: {', '.join(FREQUENCIES)}")
+    if parts.get("WKST", "MO") != "MO":
+        raise RecurrenceError("Solo se admite WKST=MO")
+    if "COUNT" in parts and "UNTIL" in parts:
+        raise RecurrenceError("COUNT y UNTIL no pueden usarse juntos")
+    if "COUNT" not in parts and "UNTIL" not in parts:
+        raise RecurrenceError("La regla necesita COUNT o UNTIL")
+
+    parsed = {
+        "freq": frequency,
+        "interval": _int("INTERVAL", parts.get("INTERVAL", "1"), 1, 1000),
+        "count": _int("COUNT", parts["COUNT"], 1, 100000) if "COUNT" in parts else None,
+        "until": None,
+        "byday": None,
+        "bymonthday": None,
+    }
+    if "UNTIL" in parts:
+        until = parts["UNTIL"]
+        try:
+            # Formato iCalendar (20250131T090000Z, 20250131) o ISO 8601
+            if until.isdigit() and len(until) == 8:
+                until = f"{until[:4]}-{until[4:6]}-{until[6:]}T23:59:59"
+            elif len(until) == 10:
+                until += "T23:59:59"
+            elif len(until) in (15, 16) and until[8] == "T":
+                until = f"{until[:4]}-{until[4:6]}-{until[6:8]}T{until[9:11]}:{until[11:13]}:{until[13:15]}{until[15:]}"
+            parsed["until"] = parse_iso(until)
+        except (ValueError, IndexError):
+            raise RecurrenceError("UNTIL debe ser una fecha como 20250131T090000Z") from None
+    if "BYDAY" in parts:
+        days = parts["BYDAY"].split(",")
+        if any(day not in WEEKDAYS for day in days):
+            raise RecurrenceError(f"BYDAY admite: {', '.join(WEEKDAYS)} (sin ordinales)")
+        parsed["byday"] = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+    if "BYMONTHDAY" in parts:
+        if frequency != "MONTHLY":
+            raise RecurrenceError("BYMONTHDAY solo se admite con FREQ=MONTHLY")
+        parsed["bymonthday"] = tuple(_int("BYMONTHDAY", day, -31, 31) for day in parts["BYMONTHDAY"].split(","))
+        if 0 in parsed["bymonthday"]:
+            raise RecurrenceError("BYMONTHDAY no admite 0")
+    return parsed
+
+def _month_days(year: int, month: int, rule: dict, start: datetime) -> list:
+    """Días del mes que cumplen BYMONTHDAY / BYDAY (por defecto, el día de `start`)"""
+    last = calendar.monthrange(year, month)[1]
+    if rule["bymonthday"] is not None:
+        days = {day if day > 0 else last + day + 1 for day in rule["bymonthday"]}
+    elif rule["byday"] is not None:
+        days = set(range(1, last + 1))
+    else:
+        days = {start.day}
+    if rule["byday"] is not None:
+        days = {day for day in days if 1 <= day <= last and calendar.weekday(year, month, day) in rule["byday"]}
+    # Un día 31 no existe en todos los meses: ese mes se salta (RFC 5545)
+    return sorted(day for day in days if 1 <= day <= last)
+
+def _candidates(start: datetime, rule: dict):
+    """Instantes que cumplen la regla en orden hasta MAX_YEARS (COUNT/UNTIL se aplican fuera)"""
+    interval = rule["interval"]
+    horizon = start + timedelta(days=366 * MAX_YEARS)
+    if rule["freq"] == "DAILY":
+        current = start
+        while current <= horizon:
+            if rule["byday"] is None or current.weekday() in rule["byday"]:
+                yield current
+            current += timedelta(days=interval)
+    elif rule["freq"] == "WEEKLY":
+        weekdays = rule["byday"] if rule["byday"] is not None else (start.weekday(),)
+        week = start - timedelta(days=start.weekday())
+        while week <= horizon:
+            for weekday in weekdays:
+                yield week + timedelta(days=weekday)
+            week += timedelta(weeks=interval)
+    else:
+        year, month = start.year, start.month
+        while (year, month) <= (horizon.year, horizon.month):
+            for day in _month_days(year, month, rule, start):
+                yield start.replace(year=year, month=month, day=day)
+            month += interval
+            year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+
+def occurrences(start: datetime, rule: dict, limit: int):
+    """
+    Generar perezosamente los inicios de la serie a partir de `start`
+
+    Cada ocurrencia conserva la hora de `start`; las anteriores a `start` no
+    se generan. Lanza RecurrenceError si la serie supera `limit` ocurrencias.
+    """
+    produced = 0
+    for candidate in _candidates(start, rule):
+        if candidate < start:
+            continue
+        if rule["until"] is not None and candidate > rule["until"]:
+            return
+        if rule["count"] is not None and produced >= rule["count"]:
+            return
+        if produced >= limit:
+            raise RecurrenceError(f"La serie supera el máximo de {limit} ocurrencias")
+        produced += 1
+        yield candidate
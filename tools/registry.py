@@ -0,0 +1,195 @@
+"""Registro único de herramientas con validación de argumentos compilada al registrar"""
+import inspect
+from datetime import date
+from time import perf_counter_ns
+from tools.projection import parse_fields, InvalidFields
+from tools.timeutils import parse_iso
+from tools.tracing import stage, traced_tool
+
+# Valores admitidos por el backend
+TASK_STATUSES = ("pending", "in_progress", "completed", "cancelled")
+TASK_PRIORITIES = ("low", "medium", "high", "urgent")
+APPOINTMENT_STATUSES = ("scheduled", "completed", "cancelled", "missed")
+
+# Etiqueta de métricas y trazas para nombres de herramienta no registrados
+UNKNOWN_TOOL = "unknown"
+
+# Marcadores de reglas de formato (además de un conjunto de valores permitidos)
+DATETIME = "datetime"  # fecha y hora ISO 8601
+DATE = "date"          # fecha YYYY-MM-DD
+FIELDS = "fields"      # proyección: lista de nombres o texto separado por comas
+
+class ToolArgumentError(ValueError):
+    """Argumentos de una llamada rechazados antes de ejecutar la herramienta"""
+
+def _check_type(name: str, expected: type):
+    """Comprobación de tipo según la anotación; bool no cuenta como int"""
+    if expected is int:
+        def check(value):
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ToolArgumentError(f"'{name}' debe ser un entero")
+    else:
+        label = {str: "un texto", bool: "un booleano", list: "una lista", dict: "un objeto", float: "un número"}
+        accepted = (int, float) if expected is float else expected
+        def check(value):
+            if not isinstance(value, accepted):
+                raise ToolArgumentError(f"'{name}' debe ser {label.get(expected, expected.__name__)}")
+    return check
+
+def _check_rule(name: str, rule):
+    """Comprobación de formato o de valores permitidos"""
+    if rule == DATETIME:
+        def check(value):
+            try:
+                parse_iso(value)
+            except (TypeError, ValueError, AttributeError):
+                raise ToolArgumentError(f"'{name}' debe ser una fecha ISO 8601, p.ej. 2025-01-31T10:00:00") from None
+    elif rule == DATE:
+        def check(value):
+            try:
+                date.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ToolArgumentError(f"'{name}' debe ser una fecha YYYY-MM-DD") from None
+    elif rule == FIELDS:
+        def check(value):
+            try:
+                parse_fields(value)
+            except InvalidFields as invalid:
+                raise ToolArgumentError(str(invalid)) from None
+    elif isinstance(rule, range):
+        def check(value):
+            if value not in rule:
+                raise ToolArgumentError(f"'{name}' debe estar entre {rule.start} y {rule.stop - 1}")
+    else:
+        allowed = frozenset(rule)
+        options = ", ".join(rule)
+        def check(value):
+            if value not in allowed:
+                raise ToolArgumentError(f"'{name}' debe ser uno de: {options}")
+    return check
+
+class ToolSpec:
+    """Herramienta registrada: función, validador compilado y coste de validación"""
+
+    __slots__ = ("name", "func", "_required", "_checks", "calls", "rejected", "total_ns", "max_ns")
+
+    def __init__(self, name: str, func, rules: dict):
+        self.name = name
+        self.func = func
+        self.calls = 0
+        self.rejected = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        parameters = inspect.signature(func).parameters
+        unknown = set(rules) - set(parameters)
+        if unknown:
+            raise ValueError(f"Reglas para parámetros inexistentes en {name}: {', '.join(sorted(unknown))}")
+        self._required = tuple(
+            param for param, info in parameters.items() if info.default is inspect.Parameter.empty
+        )
+        # Parámetro -> comprobaciones, resueltas una sola vez al registrar
+        self._checks = {}
+        for param, info in parameters.items():
+            checks = []
+            # FIELDS admite varios tipos y hace su propia comprobación
+            if info.annotation in (str, int, float, bool, list, dict) and rules.get(param) != FIELDS:
+                checks.append(_check_type(param, info.annotation))
+            if param in rules:
+                checks.append(_check_rule(param, rules[param]))
+            self._checks[param] = tuple(checks)
+
+    def _validate(self, arguments: dict):
+        checks = self._checks
+        for param, value in arguments.items():
+            param_checks = checks.get(param)
+            if param_checks is None:
+                raise ToolArgumentError(f"Argumento desconocido para {self.name}: '{param}'")
+            # None equivale a omitir un parámetro opcional
+            if value is None:
+                if param in self._required:
+                    raise ToolArgumentError(f"'{param}' es obligatorio")
+                continue
+            for check in param_checks:
+                check(value)
+        for param in self._required:
+            if param not in arguments:
+                raise ToolArgumentError(f"'{param}' es obligatorio")
+
+    def validate(self, arguments: dict):
+        """Lanzar ToolArgumentError si los argumentos no son válidos, midiendo el coste"""
+        started = perf_counter_ns()
+        try:
+            with stage("validate"):
+                self._validate(arguments)
+        except ToolArgumentError:
+            self.rejected += 1
+            raise
+        finally:
+            elapsed = perf_counter_ns() - started
+            self.calls += 1
+            self.total_ns += elapsed
+            if elapsed > self.max_ns:
+                self.max_ns = elapsed
+
+    def get_stats(self) -> dict:
+        return {
+            "validations": self.calls,
+            "rejected": self.rejected,
+            "avg_us": round(self.total_ns / self.calls / 1000, 2) if self.calls else 0.0,
+            "max_us": round(self.max_ns / 1000, 2),
+        }
+
+class ToolRegistry:
+    """
+    Definición única de las herramientas que comparten MCP y el wrapper HTTP
+
+    Cada herramienta se registra una vez (decorador `tool`) con reglas por
+    parámetro: un conjunto de valores permitidos, DATETIME, DATE, FIELDS o un range.
+    Los tipos salen de las anotaciones de la función. Así una prioridad o una
+    fecha inválidas se rechazan en microsegundos, antes de cualquier petición.
+    """
+
+    def __init__(self):
+        self._specs = {}
+
+    def tool(self, **rules):
+        """Decorador que registra la función (con su span "execute" si hay trazado)"""
+        def register(func):
+            func = traced_tool(func)
+            self._specs[func.__name__] = ToolSpec(func.__name__, func, rules)
+            return func
+        return register
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def __getitem__(self, name: str) -> ToolSpec:
+        return self._specs[name]
+
+    def label(self, name: str) -> str:
+        """
+        Nombre para etiquetas de métricas y trazas: el de la herramienta o UNKNOWN_TOOL
+
+        El nombre llega del cliente MCP; sin esto cada nombre inventado crearía
+        series nuevas para siempre.
+        """
+        return name if name in self._specs else UNKNOWN_TOOL
+
+    def names(self) -> list:
+        return list(self._specs)
+
+    def functions(self) -> dict:
+        """Nombre -> función, en el orden de registro"""
+        return {name: spec.func for name, spec in self._specs.items()}
+
+    def validate(self, name: str, arguments: dict):
+        """Validar los argumentos de `name`; las herramientas no registradas no se validan"""
+        spec = self._specs.get(name)
+        if spec is not None:
+            spec.validate(arguments)
+
+    def get_stats(self) -> dict:
+        return {name: spec.get_stats() for name, spec in self._specs.items()}
+
+# Instancia global: main.py registra las herramientas y ambos transportes la consultan
+tool_registry = ToolRegistry()
@@ -0,0 +1,99 @@
+"""Validadores HTTP (ETag / Last-Modified) de las lecturas para peticiones condicionales"""
+from collections import OrderedDict
+from config import CONDITIONAL_GET_ENABLED, CONDITIONAL_GET_MAX_ENTRIES, CONDITIONAL_GET_MAX_BYTES
+
+class StoredResponse:
+    """Cuerpo ya decodificado de una lectura junto con sus validadores"""
+
+    __slots__ = ("etag", "last_modified", "value", "size", "generation")
+
+    def __init__(self, etag: str, last_modified: str, value, size: int, generation: int = None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.value = value
+        self.size = size
+        self.generation = generation  # escrituras propias del recurso al iniciar la lectura
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+def resource_key(path: str, params: dict = None) -> tuple:
+    """Clave del recurso: ruta y parámetros (incluido user_id) en orden estable"""
+    return (path, tuple(sorted((params or {}).items())))
+
+class ValidatorStore:
+    """
+    Última respuesta con validadores de cada recurso, con LRU por entradas y bytes
+
+    A diferencia de ResponseCache no caduca: quien decide si sigue vigente es
+    el backend, al responder 304 a la petición condicional. Las escrituras
+    propias sí cuentan: cada respuesta guarda la generación de escrituras de
+    ResponseCache con la que se pidió y solo se revalida con esa misma. Tras
+    una escritura (o si hubo una durante la lectura) se hace un GET completo,
+    porque un Last-Modified con resolución de 1 s podría dar un 304 con el
+    listado anterior. Los valores se comparten y no deben mutarse.
+    """
+
+    def __init__(self, max_entries: int = CONDITIONAL_GET_MAX_ENTRIES, max_bytes: int = CONDITIONAL_GET_MAX_BYTES,
+                 enabled: bool = CONDITIONAL_GET_ENABLED):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.not_modified = 0
+        self.modified = 0
+        self.bytes_saved = 0
+        self.skipped_after_write = 0
+
+    def get(self, key: tuple, generation: int = None):
+        """Respuesta guardada para revalidar, o None si no hay o es anterior a una escritura"""
+        if not self.enabled:
+            return None
+        stored = self._entries.get(key)
+        if stored is None:
+            return None
+        if stored.generation != generation:
+            self.skipped_after_write += 1
+            return None
+        self._entries.move_to_end(key)
+        return stored
+
+    def store(self, key: tuple, response, value, size: int, generation: int = None):
+        """Guardar `value` si la respuesta trae ETag o Last-Modified"""
+        if not self.enabled:
+            return
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        if (not etag and not last_modified) or size > self.max_bytes:
+            return
+        self._entries[key] = StoredResponse(etag, last_modified, value, size, generation)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, oldest = self._entries.popitem(last=False)
+            self._bytes -= oldest.size
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> dict:
+        revalidations = self.not_modified + self.modified
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "not_modified": self.not_modified,
+            "modified": self.modified,
+            "not_modified_ratio": round(self.not_modified / revalidations, 4) if revalidations else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "skipped_after_write": self.skipped_after_write,
+        }
@@ -0,0 +1,52 @@
+"""Coalescencia (single-flight) de lecturas idénticas concurrentes"""
+import asyncio
+
+class SingleFlight:
+    """
+    Comparte una única petición en curso entre llamadas con la misma clave
+
+    La petición se ejecuta como tarea propia: si quien la inició se cancela,
+    el resto de llamadas en espera siguen recibiendo el resultado. Cada
+    llamada que se une a una petición en curso recibe una copia superficial
+    (con `copy()`, que en RawJSON conserva el cuerpo original).
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def do(self, key, fetch):
+        """Devolver el resultado de `fetch()` compartiéndolo entre llamadas concurrentes"""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+            result = await asyncio.shield(task)
+            return result.copy() if isinstance(result, dict) else result
+
+        self.leaders += 1
+        task = asyncio.ensure_future(fetch())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marcar la excepción como recuperada aunque ya no quede nadie esperando
+        if not task.cancelled():
+            task.exception()
+
+    def reset(self):
+        """Olvidar las peticiones en curso de otro proceso (fork): sus tareas no existen aquí"""
+        self._in_flight = {}
+
+    def get_stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._in_flight),
+        }
+
+# Instancia global para las lecturas de listados
+single_flight = SingleFlight()
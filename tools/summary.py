@@ -0,0 +1,166 @@
+"""Resúmenes de tareas y citas mantenidos incrementalmente a partir de las escrituras"""
+from time import monotonic
+from config import SUMMARY_RESYNC_INTERVAL
+from tools.bounded import LRUDict, WriteGenerations
+
+# Por colección: clave del total en la respuesta y contadores (clave -> campo del registro)
+SUMMARY_SPECS = {
+    "tasks": ("total_tasks", {"by_status": "status", "by_priority": "priority"}),
+    "appointments": ("total_appointments", {"by_status": "status"}),
+}
+
+class _CounterIndex:
+    """Contadores por campo de una colección más el índice id -> valores para deshacerlos"""
+
+    def __init__(self, total_key: str, counters: dict):
+        self.total_key = total_key
+        self.counter_fields = counters
+        self.items = {}
+        self.counters = {name: {} for name in counters}
+        self.synced_at = 0.0
+        self.dirty = False
+
+    def load(self, items: list):
+        self.items.clear()
+        for counter in self.counters.values():
+            counter.clear()
+        for position, item in enumerate(items):
+            self._add(item.get("id", f"#{position}"), self._values(item))
+        self.synced_at = monotonic()
+        self.dirty = False
+
+    def _values(self, item: dict, previous: tuple = None) -> tuple:
+        # En actualizaciones parciales se conservan los valores que no vienen en la respuesta
+        if previous is None:
+            return tuple(item.get(field, "unknown") for field in self.counter_fields.values())
+        return tuple(item.get(field, old) for field, old in zip(self.counter_fields.values(), previous))
+
+    def _add(self, item_id, values: tuple):
+        self.items[item_id] = values
+        for counter, value in zip(self.counters.values(), values):
+            counter[value] = counter.get(value, 0) + 1
+
+    def _discard(self, item_id):
+        values = self.items.pop(item_id, None)
+        if values is None:
+            return None
+        for counter, value in zip(self.counters.values(), values):
+            counter[value] -= 1
+            if not counter[value]:
+                del counter[value]
+        return values
+
+    def upsert(self, item_id, item: dict, expect_existing: bool):
+        previous = self._discard(item_id)
+        if expect_existing and previous is None:
+            # El backend conoce un registro que no teníamos: hubo cambios externos
+            self.dirty = True
+        self._add(item_id, self._values(item, previous))
+
+    def remove(self, item_id):
+        if self._discard(item_id) is None:
+            self.dirty = True
+
+    def snapshot(self) -> dict:
+        summary = {self.total_key: len(self.items)}
+        for name, counter in self.counters.items():
+            summary[name] = dict(counter)
+        return summary
+
+class SummaryEngine:
+    """
+    Mantiene los contadores de resumen por usuario
+
+    La primera consulta descarga el listado completo una vez; después cada
+    escritura correcta ajusta los contadores en O(1). Se vuelve a sincronizar
+    con el backend al pasar `resync_interval` segundos o al detectar deriva
+    (escrituras fallidas o ids desconocidos).
+    """
+
+    def __init__(self, resync_interval: float = SUMMARY_RESYNC_INTERVAL):
+        self.resync_interval = resync_interval
+        self._indexes = LRUDict()               # (colección, usuario) -> _CounterIndex
+        self._generations = WriteGenerations()  # (colección, usuario) -> escrituras registradas
+        self.resyncs = 0
+        self.incremental_updates = 0
+        self.drift_detected = 0
+
+    def _stale(self, index: _CounterIndex) -> bool:
+        return index.dirty or monotonic() - index.synced_at > self.resync_interval
+
+    async def get_summary(self, collection: str, user_id: str, fetch) -> dict:
+        """Devolver el resumen, sincronizando antes con `fetch()` si hace falta"""
+        key = (collection, user_id)
+        index = self._indexes.get(key)
+        if index is None or self._stale(index):
+            generation = self._generations.get(key)
+            data = await fetch()
+            if "error" in data:
+                return data
+            index = self._indexes.get(key)
+            if index is None or self._stale(index):
+                # `fetch` puede haber resincronizado ya al descargar el listado sin filtros
+                index = self.load(collection, user_id, data.get(collection, []))
+            if self._generations.get(key) != generation:
+                # Una escritura terminó durante la descarga: el listado puede no reflejarla
+                index.dirty = True
+        return index.snapshot()
+
+    def load(self, collection: str, user_id: str, items: list) -> _CounterIndex:
+        """Reconstruir los contadores desde un listado completo (sin filtros)"""
+        key = (collection, user_id)
+        index = self._indexes.get(key)
+        if index is None:
+            index = _CounterIndex(*SUMMARY_SPECS[collection])
+            self._indexes[key] = index
+        index.load(items)
+        self.resyncs += 1
+        return index
+
+    def _index_for_write(self, collection: str, user_id: str):
+        key = (collection, user_id)
+        self._generations.bump(key)
+        return self._indexes.get(key)
+
+    def record_upsert(self, collection: str, user_id: str, item_id, item, created: bool = False):
+        """Aplicar el resultado de una creación o actualización correcta"""
+        index = self._index_for_write(collection, user_id)
+        if index is None:
+            return
+        item_id = item_id or (item.get("id") if isinstance(item, dict) else None)
+        if item_id is None or not isinstance(item, dict):
+            self.mark_dirty(collection, user_id)
+            return
+        index.upsert(item_id, item, expect_existing=not created)
+        self.incremental_updates += 1
+        if index.dirty:
+            self.drift_detected += 1
+
+    def record_delete(self, collection: str, user_id: str, item_id):
+        """Aplicar una eliminación correcta"""
+        index = self._index_for_write(collection, user_id)
+        if index is None:
+            return
+        index.remove(item_id)
+        self.incremental_updates += 1
+        if index.dirty:
+            self.drift_detected += 1
+
+    def mark_dirty(self, collection: str, user_id: str):
+        """Forzar resincronización (p.ej. escritura con resultado desconocido)"""
+        index = self._index_for_write(collection, user_id)
+        if index is not None and not index.dirty:
+            index.dirty = True
+            self.drift_detected += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "indexes": len(self._indexes),
+            "evicted": self._indexes.evictions,
+            "resyncs": self.resyncs,
+            "incremental_updates": self.incremental_updates,
+            "drift_detected": self.drift_detected,
+        }
+
+# Instancia global compartida por las herramientas de tareas y citas
+summary_engine = SummaryEngine()
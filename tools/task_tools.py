@@ -1,22 +1,29 @@
 """Herramientas MCP para gestión de tareas según requerimientos del documento"""
-import os
-import requests
+import httpx
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
-
-# URL del backend API
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8002") + "/api/v1"
+from tools.tenant import current_user_id
+from tools.backend_client import backend
+from tools.cache import response_cache, cache_key, MISS
+from tools.summary import summary_engine
+from tools.singleflight import single_flight
+from tools.pagination import paginate, InvalidCursor
+from tools.json_stream import iter_items
+from tools.fast_json import decode_response
+from tools.projection import parse_fields, project_item, shape_listing, InvalidFields
+from tools.bulk import run_bulk, require_object
+from tools.registry import tool_registry
 
 class TaskTool:
     """Herramientas MCP para tareas según el documento de requerimientos"""
     
     @staticmethod
-    def create_task(title: str, description: str = "", due_date: str = None, priority: str = "medium", category: str = "personal", tags: List[str] = None) -> dict:
+    async def create_task(title: str, description: str = "", due_date: str = None, priority: str = "medium", category: str = "personal", tags: List[str] = None) -> dict:
         """
         Crear una nueva tarea
         Herramienta MCP según el documento de requerimientos
         """
+        user_id = current_user_id()
         if tags is None:
             tags = []
         
@@ -32,24 +39,73 @@ class TaskTool:
             task_data["due_date"] = due_date
         
         try:
-            response = requests.post(
-                f"{BACKEND_URL}/tasks/",
+            response = await backend.post(
+                "/tasks/",
                 json=task_data,
-                params={"user_id": "default-user"},
-                timeout=5
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            task = decode_response(response)
+            summary_engine.record_upsert("tasks", user_id, None, task, created=True)
+            return task
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("tasks", user_id)
             return {"error": f"Error al crear tarea: {str(e)}"}
+        finally:
+            # Una escritura fallida por timeout pudo aplicarse igualmente: invalidar siempre
+            response_cache.invalidate("tasks", user_id)
     
     @staticmethod
-    def list_tasks(status: str = None, priority: str = None, category: str = None) -> dict:
+    async def list_tasks(status: str = None, priority: str = None, category: str = None,
+                         limit: int = None, cursor: str = None, fields=None, compact: bool = False) -> dict:
         """
         Listar tareas con filtros opcionales
         Herramienta MCP según el documento de requerimientos
+        Con `limit`/`cursor` devuelve una página y `next_cursor` para la siguiente
+        Con `fields` solo se devuelven esos campos; con `compact` la lista va por columnas
+        """
+        try:
+            fields = parse_fields(fields)
+        except InvalidFields as e:
+            return {"error": str(e)}
+        params = TaskTool._list_params(status, priority, category)
+        key = cache_key("tasks", params)
+        data = response_cache.get(key)
+        if data is MISS:
+            # Lecturas idénticas concurrentes comparten una sola petición al backend
+            data = await single_flight.do(key, lambda: TaskTool._fetch_tasks(params, key))
+        if "error" in data:
+            return data
+        try:
+            page = paginate(data, "tasks", limit, cursor)
+        except InvalidCursor as e:
+            return {"error": str(e)}
+        # La caché guarda registros completos (los comparten resúmenes y otras
+        # proyecciones): solo se recorta la página que se devuelve
+        return shape_listing(page, "tasks", fields, compact)
+    
+    @staticmethod
+    async def stream_tasks(status: str = None, priority: str = None, category: str = None, fields=None):
+        """
+        Producir las tareas una a una según se decodifican de la respuesta del backend
+        Usado por el modo streaming del wrapper HTTP: la memoria no crece con el listado
+        Con `fields` cada tarea se recorta nada más decodificarla
         """
-        params = {"user_id": "default-user"}
+        fields = parse_fields(fields)
+        params = TaskTool._list_params(status, priority, category)
+        cached = response_cache.get(cache_key("tasks", params))
+        if cached is not MISS:
+            for task in cached.get("tasks", []):
+                yield project_item(task, fields)
+            return
+        async with backend.stream("GET", "/tasks/", params=params) as response:
+            response.raise_for_status()
+            async for task in iter_items(response.aiter_bytes(), "tasks"):
+                yield project_item(task, fields)
+    
+    @staticmethod
+    def _list_params(status: str = None, priority: str = None, category: str = None) -> dict:
+        params = {"user_id": current_user_id()}
         
         if status:
             params["status"] = status
@@ -57,24 +113,32 @@ class TaskTool:
             params["priority"] = priority
         if category:
             params["category"] = category
+        return params
+    
+    @staticmethod
+    async def _fetch_tasks(params: dict, key: tuple) -> dict:
+        """Descargar el listado del backend y guardarlo en caché"""
+        generation = response_cache.generation("tasks", params["user_id"])
         
         try:
-            response = requests.get(
-                f"{BACKEND_URL}/tasks/",
-                params=params,
-                timeout=5
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            # GET condicional: si el listado no cambió (304) se reutiliza el ya decodificado
+            data, size = await backend.conditional_get("/tasks/", params=params, decode=decode_response,
+                                                       generation=generation)
+            response_cache.set(key, data, size, generation)
+            if len(params) == 1 and response_cache.generation("tasks", params["user_id"]) == generation:
+                # Un listado sin filtros sirve también para resincronizar el resumen
+                summary_engine.load("tasks", params["user_id"], data.get("tasks", []))
+            return data
+        except httpx.HTTPError as e:
             return {"error": f"Error al listar tareas: {str(e)}"}
     
     @staticmethod
-    def update_task(task_id: str, **updates) -> dict:
+    async def update_task(task_id: str, **updates) -> dict:
         """
         Actualizar una tarea existente
         Herramienta MCP según el documento de requerimientos
         """
+        user_id = current_user_id()
         # Filtrar campos válidos
         valid_fields = ["title", "description", "status", "priority", "due_date", "category", "tags"]
         task_updates = {k: v for k, v in updates.items() if k in valid_fields and v is not None}
@@ -83,67 +147,126 @@ class TaskTool:
             return {"error": "No se proporcionaron campos válidos para actualizar"}
         
         try:
-            response = requests.put(
-                f"{BACKEND_URL}/tasks/{task_id}",
+            response = await backend.put(
+                f"/tasks/{task_id}",
                 json=task_updates,
-                params={"user_id": "default-user"},
-                timeout=5
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            task = decode_response(response)
+            summary_engine.record_upsert("tasks", user_id, task_id, task)
+            return task
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("tasks", user_id)
             return {"error": f"Error al actualizar tarea: {str(e)}"}
+        finally:
+            # Una escritura fallida por timeout pudo aplicarse igualmente: invalidar siempre
+            response_cache.invalidate("tasks", user_id)
     
     @staticmethod
-    def delete_task(task_id: str) -> dict:
+    async def delete_task(task_id: str) -> dict:
         """
         Eliminar una tarea
         Herramienta MCP según el documento de requerimientos
         """
+        user_id = current_user_id()
         try:
-            response = requests.delete(
-                f"{BACKEND_URL}/tasks/{task_id}",
-                params={"user_id": "default-user"},
-                timeout=5
+            response = await backend.delete(
+                f"/tasks/{task_id}",
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            result = decode_response(response)
+            summary_engine.record_delete("tasks", user_id, task_id)
+            return result
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("tasks", user_id)
             return {"error": f"Error al eliminar tarea: {str(e)}"}
+        finally:
+            # Una escritura fallida por timeout pudo aplicarse igualmente: invalidar siempre
+            response_cache.invalidate("tasks", user_id)
     
     @staticmethod
-    def get_task(task_id: str) -> dict:
+    async def get_task(task_id: str) -> dict:
         """
         Obtener una tarea específica por ID
         Herramienta MCP adicional para consultas detalladas
         """
+        user_id = current_user_id()
         try:
-            response = requests.get(
-                f"{BACKEND_URL}/tasks/{task_id}",
-                params={"user_id": "default-user"},
-                timeout=5
+            response = await backend.get(
+                f"/tasks/{task_id}",
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return decode_response(response)
+        except httpx.HTTPError as e:
             return {"error": f"Error al obtener tarea: {str(e)}"}
     
     @staticmethod
-    def complete_task(task_id: str) -> dict:
+    async def complete_task(task_id: str) -> dict:
         """
         Marcar tarea como completada
         Herramienta MCP de conveniencia
         """
+        user_id = current_user_id()
         try:
-            response = requests.post(
-                f"{BACKEND_URL}/tasks/{task_id}/complete",
-                params={"user_id": "default-user"},
-                timeout=5
+            response = await backend.post(
+                f"/tasks/{task_id}/complete",
+                params={"user_id": user_id}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            task = decode_response(response)
+            summary_engine.record_upsert("tasks", user_id, task_id, task)
+            return task
+        except httpx.HTTPError as e:
+            summary_engine.mark_dirty("tasks", user_id)
             return {"error": f"Error al completar tarea: {str(e)}"}
+        finally:
+            # Una escritura fallida por timeout pudo aplicarse igualmente: invalidar siempre
+            response_cache.invalidate("tasks", user_id)
+
+    @staticmethod
+    async def create_tasks_bulk(tasks: List[dict]) -> dict:
+        """
+        Crear varias tareas con peticiones concurrentes (hasta BULK_MAX_CONCURRENCY)
+        Cada elemento admite los mismos campos que create_task
+        """
+        async def create(item):
+            # Cada elemento con las reglas de create_task: uno inválido no llega al backend
+            tool_registry.validate("create_task", require_object(item, "title"))
+            return await TaskTool.create_task(**item)
+        return await run_bulk(tasks, create, "tasks")
+
+    @staticmethod
+    async def update_tasks_bulk(updates: List[dict]) -> dict:
+        """
+        Actualizar varias tareas con peticiones concurrentes
+        Cada elemento lleva `task_id` y los campos a cambiar
+        """
+        async def update(item):
+            tool_registry.validate("update_task", require_object(item, "task_id"))
+            fields = dict(item)
+            return await TaskTool.update_task(fields.pop("task_id"), **fields)
+        return await run_bulk(updates, update, "updates")
+
+    @staticmethod
+    async def complete_tasks_bulk(task_ids: List[str]) -> dict:
+        """Marcar varias tareas como completadas con peticiones concurrentes"""
+        async def complete(task_id):
+            if not isinstance(task_id, str) or not task_id:
+                raise ValueError("Cada elemento debe ser un task_id")
+            return await TaskTool.complete_task(task_id)
+        return await run_bulk(task_ids, complete, "task_ids")
+
+    @staticmethod
+    async def get_task_summary() -> dict:
+        """
+        Obtener resumen de tareas por estado y prioridad
+        Mantenido incrementalmente: solo descarga el listado al resincronizar
+        """
+        user_id = current_user_id()
+        return await summary_engine.get_summary("tasks", user_id, TaskTool.list_tasks)
 
 # Instancia global de herramientas de tareas
 task_tools = TaskTool()
@@ -0,0 +1,39 @@
+"""Identidad del usuario (tenant) de la invocación, propagada hasta el backend"""
+import contextvars
+import re
+from contextlib import contextmanager
+from config import DEFAULT_USER_ID
+
+_current_user = contextvars.ContextVar("tool_user_id", default=None)
+
+# Identificadores aceptados en la cabecera X-User-Id o en el argumento user_id
+_VALID_USER_ID = re.compile(r"^[A-Za-z0-9_.@:-]{1,128}$")
+
+class InvalidUserId(ValueError):
+    """Identificador de usuario vacío, demasiado largo o con caracteres no permitidos"""
+
+def validate_user_id(user_id) -> str:
+    if not isinstance(user_id, str) or not _VALID_USER_ID.match(user_id):
+        raise InvalidUserId("user_id inválido: 1-128 caracteres alfanuméricos o _ . @ : -")
+    return user_id
+
+@contextmanager
+def tenant_scope(user_id: str = None):
+    """
+    Establecer el usuario de la invocación actual
+
+    Sin `user_id` se mantiene el del contexto exterior (o DEFAULT_USER_ID).
+    Las tareas creadas dentro del bloque lo heredan vía contextvars.
+    """
+    if user_id is None:
+        yield current_user_id()
+        return
+    token = _current_user.set(validate_user_id(user_id))
+    try:
+        yield user_id
+    finally:
+        _current_user.reset(token)
+
+def current_user_id() -> str:
+    """Usuario de la invocación en curso o DEFAULT_USER_ID si no se indicó"""
+    return _current_user.get() or DEFAULT_USER_ID
@@ -0,0 +1,18 @@
+"""Utilidades de fechas ISO 8601 compartidas por las herramientas"""
+from datetime import datetime, timezone
+
+def parse_iso(value: str) -> datetime:
+    """
+    Convertir una fecha ISO (admite sufijo Z) a datetime con zona horaria
+
+    Las fechas sin zona se interpretan como UTC para poder compararlas con
+    las que sí la traen. Lanza ValueError si el formato no es válido.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def to_timestamp(value: str) -> float:
+    """Segundos epoch de una fecha ISO (ver parse_iso)"""
+    return parse_iso(value).timestamp()
@@ -0,0 +1,373 @@
+"""Trazas por llamada a herramienta: etapas, exportación OTLP/JSON y registro de llamadas lentas"""
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter_ns, time_ns
+from config import (
+    TRACING_ENABLED, TRACE_SAMPLE_RATE, TRACE_EXPORT_FILE,
+    TRACE_SLOW_THRESHOLD_MS, TRACE_SLOW_LOG_FILE, TRACE_SLOW_KEEP,
+    SERVER_NAME, SERVER_VERSION
+)
+from tools.metrics import registry
+from tools.tenant import current_user_id
+
+# Etapas del desglose; el tiempo no cubierto por ninguna se cuenta como "other"
+STAGES = ("parse", "validate", "queue", "backend", "decode", "serialize")
+
+# Tipos de span OTLP
+_KIND_INTERNAL = 1
+_KIND_SERVER = 2
+_KIND_CLIENT = 3
+
+_current_trace = contextvars.ContextVar("tool_trace", default=None)
+_current_span = contextvars.ContextVar("tool_span", default=None)
+
+stage_duration = registry.histogram("mcp_tool_stage_seconds", "Tiempo de las llamadas a herramientas por etapa",
+                                    ("stage",))
+slow_calls = registry.counter("mcp_slow_tool_calls_total", "Llamadas a herramientas por encima de TRACE_SLOW_THRESHOLD_MS",
+                              ("tool", "transport"))
+
+class Span:
+    """Intervalo de una etapa dentro de una traza; se usa como context manager"""
+
+    __slots__ = ("trace", "name", "parent", "start_ns", "end_ns", "attributes", "error", "_token", "_span_id")
+
+    def __init__(self, trace: "Trace", name: str, attributes: dict = None):
+        self.trace = trace
+        self.name = name
+        self.parent = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error = None
+        self._token = None
+        self._span_id = None
+
+    @property
+    def span_id(self) -> str:
+        # Solo se genera al exportar: la mayoría de las trazas no se exportan
+        if self._span_id is None:
+            self._span_id = f"{random.getrandbits(64):016x}"
+        return self._span_id
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None and parent.trace is self.trace:
+            self.parent = parent
+        self._token = _current_span.set(self)
+        self.start_ns = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = perf_counter_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.trace.spans.append(self)
+        return False
+
+class _NoSpan:
+    """Span vacío para cuando no hay traza activa"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+class Trace:
+    """Una llamada a herramienta: span raíz y spans de sus etapas"""
+
+    __slots__ = ("trace_id", "root_id", "tool", "transport", "start_ns", "start_unix_ns", "end_ns",
+                 "spans", "attributes", "error")
+
+    def __init__(self, tool: str, transport: str, attributes: dict = None):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.root_id = f"{random.getrandbits(64):016x}"
+        self.tool = tool
+        self.transport = transport
+        self.attributes = attributes or {}
+        self.error = None
+        self.spans = []
+        self.start_unix_ns = time_ns()
+        self.start_ns = perf_counter_ns()
+        self.end_ns = 0
+
+    def add_span(self, name: str, start_ns: int, end_ns: int):
+        """Registrar una etapa medida por diferencia de instantes (sin context manager)"""
+        span = Span(self, name)
+        span.start_ns = start_ns
+        span.end_ns = end_ns
+        self.spans.append(span)
+
+    def attribute_framework_time(self):
+        """
+        Repartir el tiempo de FastMCP alrededor del span "execute" (transporte MCP)
+
+        La validación pydantic de los argumentos ocurre antes de ejecutar la
+        función y la conversión del resultado después, ambas dentro de
+        call_next: se anotan como parse y serialize.
+        """
+        execute = next((span for span in self.spans if span.name == "execute"), None)
+        if execute is None:
+            return
+        parse_start = max((span.end_ns for span in self.spans if span.end_ns <= execute.start_ns),
+                          default=self.start_ns)
+        self.add_span("parse", parse_start, execute.start_ns)
+        self.add_span("serialize", execute.end_ns, perf_counter_ns())
+
+    def duration_ns(self) -> int:
+        return (self.end_ns or perf_counter_ns()) - self.start_ns
+
+    def stage_nanos(self) -> dict:
+        """
+        Nanosegundos por etapa
+
+        Las peticiones en paralelo (cobertura, *_bulk) se suman por separado,
+        así que las etapas pueden superar la duración total; "other" nunca es negativo.
+        """
+        totals = dict.fromkeys(STAGES, 0)
+        for span in self.spans:
+            if span.name in totals:
+                totals[span.name] += span.end_ns - span.start_ns
+        totals["other"] = max(0, self.duration_ns() - sum(totals.values()))
+        return totals
+
+    def stages(self) -> dict:
+        """Milisegundos por etapa"""
+        return {stage: round(nanos / 1e6, 3) for stage, nanos in self.stage_nanos().items()}
+
+    def breakdown(self) -> dict:
+        """Registro de llamada lenta: duración, etapas y spans en orden de inicio"""
+        return {
+            "timestamp": datetime.fromtimestamp(self.start_unix_ns / 1e9, timezone.utc).isoformat(),
+            "trace_id": self.trace_id,
+            "tool": self.tool,
+            "transport": self.transport,
+            "user_id": self.attributes.get("user.id"),
+            "duration_ms": round(self.duration_ns() / 1e6, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+            "stages": self.stages(),
+            "spans": [
+                {
+                    "name": span.name,
+                    "start_ms": round((span.start_ns - self.start_ns) / 1e6, 3),
+                    "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+                    **({"error": span.error} if span.error else {}),
+                    **span.attributes,
+                }
+                for span in sorted(self.spans, key=lambda span: span.start_ns)
+            ],
+        }
+
+    def to_otlp(self) -> dict:
+        """Traza en formato OTLP/JSON (ExportTraceServiceRequest)"""
+        offset = self.start_unix_ns - self.start_ns
+
+        def otlp_span(span_id, parent_id, name, kind, start_ns, end_ns, attributes, error):
+            status = {"code": 2, "message": error} if error else {"code": 0}
+            return {
+                "traceId": self.trace_id,
+                "spanId": span_id,
+                "parentSpanId": parent_id,
+                "name": name,
+                "kind": kind,
+                "startTimeUnixNano": str(start_ns + offset),
+                "endTimeUnixNano": str(end_ns + offset),
+                "attributes": _otlp_attributes(attributes),
+                "status": status,
+            }
+
+        spans = [otlp_span(self.root_id, "", f"tools/call {self.tool}", _KIND_SERVER, self.start_ns,
+                           self.start_ns + self.duration_ns(),
+                           {"mcp.tool.name": self.tool, "mcp.transport": self.transport, **self.attributes},
+                           self.error)]
+        for span in sorted(self.spans, key=lambda span: span.start_ns):
+            kind = _KIND_CLIENT if span.name == "backend" else _KIND_INTERNAL
+            parent_id = span.parent.span_id if span.parent is not None else self.root_id
+            spans.append(otlp_span(span.span_id, parent_id, span.name, kind, span.start_ns, span.end_ns,
+                                   span.attributes, span.error))
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({
+                    "service.name": SERVER_NAME,
+                    "service.version": SERVER_VERSION,
+                    "process.pid": os.getpid(),
+                })},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }]
+        }
+
+class Tracer:
+    """
+    Traza cada llamada a herramienta y decide al terminar qué hacer con ella
+
+    Los spans se registran siempre (son unas pocas lecturas del reloj por
+    llamada); al terminar, una fracción `sample_rate` se exporta en OTLP/JSON
+    a `export_file` y cualquier llamada por encima de `slow_threshold_ms` se
+    guarda con su desglose en memoria y, si se indica, en `slow_log_file`.
+    """
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, sample_rate: float = TRACE_SAMPLE_RATE,
+                 export_file: str = TRACE_EXPORT_FILE, slow_threshold_ms: float = TRACE_SLOW_THRESHOLD_MS,
+                 slow_log_file: str = TRACE_SLOW_LOG_FILE, slow_keep: int = TRACE_SLOW_KEEP):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.export_file = export_file
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_file = slow_log_file
+        self.recent_slow = deque(maxlen=slow_keep)
+        self.traces = 0
+        self.exported = 0
+        self.slow = 0
+        self.write_errors = 0
+        self._files = {}
+
+    @contextmanager
+    def trace_call(self, tool: str, transport: str, attributes: dict = None):
+        """
+        Trazar una llamada; dentro de una traza ya activa no se abre otra
+
+        Devuelve la traza (o None si el trazado está desactivado).
+        """
+        outer = _current_trace.get()
+        if not self.enabled or outer is not None:
+            yield outer
+            return
+        trace = Trace(tool, transport, attributes)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(None)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.error = type(e).__name__
+            raise
+        finally:
+            trace.end_ns = perf_counter_ns()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            self._finish(trace)
+
+    def _finish(self, trace: Trace):
+        self.traces += 1
+        for stage, nanos in trace.stage_nanos().items():
+            if nanos:
+                stage_duration.observe(nanos / 1e9, stage)
+        if self.export_file and random.random() < self.sample_rate:
+            self.exported += 1
+            self._write(self.export_file, trace.to_otlp())
+        if self.slow_threshold_ms > 0 and trace.duration_ns() >= self.slow_threshold_ms * 1e6:
+            self.slow += 1
+            slow_calls.inc(trace.tool, trace.transport)
+            record = trace.breakdown()
+            self.recent_slow.append(record)
+            if self.slow_log_file:
+                self._write(self.slow_log_file, record)
+
+    def _write(self, path: str, record: dict):
+        """Añadir una línea JSON al fichero; un fallo de escritura no afecta a la llamada"""
+        try:
+            handle = self._files.get(path)
+            if handle is None:
+                # Sin buffer: cada línea es un único write en modo append, así que
+                # varios workers pueden compartir el fichero sin mezclar líneas
+                handle = self._files[path] = open(path, "ab", buffering=0)
+            handle.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode() + b"\n")
+        except OSError:
+            self.write_errors += 1
+
+    def recent_slow_calls(self) -> list:
+        """Llamadas lentas recientes, de la más nueva a la más antigua"""
+        return list(reversed(self.recent_slow))
+
+    def reset(self):
+        """Descartar los ficheros y registros heredados de otro proceso (fork)"""
+        self._files = {}
+        self.recent_slow.clear()
+
+    def close(self):
+        for handle in self._files.values():
+            handle.close()
+        self._files = {}
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "traces": self.traces,
+            "exported": self.exported,
+            "slow": self.slow,
+            "write_errors": self.write_errors,
+        }
+
+# Instancia global compartida por ambos transportes
+tracer = Tracer()
+
+def stage(name: str, attributes: dict = None):
+    """Span de una etapa de la llamada en curso; sin traza activa no hace nada"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return Span(trace, name, attributes)
+
+def set_attribute(key: str, value):
+    """Añadir un atributo al span raíz de la llamada en curso"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes[key] = value
+
+def mark_error(error: str = "tool_error"):
+    """Marcar como fallida la llamada en curso (p.ej. la herramienta devolvió un error)"""
+    trace = _current_trace.get()
+    if trace is not None and trace.error is None:
+        trace.error = error
+
+def traced_tool(func):
+    """
+    Envolver una herramienta asíncrona en un span "execute" con el usuario de la llamada
+
+    Separa el cuerpo de la herramienta de lo que hace el transporte antes y
+    después. Con el trazado desactivado se devuelve la misma función.
+    """
+    if not TRACING_ENABLED or not inspect.iscoroutinefunction(func):
+        return func
+
+    @functools.wraps(func)
+    async def execute(*args, **kwargs):
+        trace = _current_trace.get()
+        if trace is None:
+            return await func(*args, **kwargs)
+        trace.attributes["user.id"] = current_user_id()
+        with Span(trace, "execute"):
+            return await func(*args, **kwargs)
+    return execute